@@ -18,6 +18,7 @@ from typing import Any
 
 RECALL_PATH = Path("/Users/dunova/.agents/skills/recall/scripts/recall.py")
 MCP_PATH = Path("/Users/dunova/.codex/skills/openviking-memory-sync/scripts/openviking_mcp.py")
+DAEMON_PATH = MCP_PATH.with_name("viking_daemon.py")
 OPENVIKING_PYTHON = Path("/Users/dunova/.openviking_env/bin/python")
 RECALL_DB = Path.home() / ".recall.db"
 RANDOM_SEED = 20260306
@@ -180,12 +181,100 @@ print(m.save_conversation_memory('Regression ' + marker, marker, ['regression'])
 print('---')
 print(m.query_viking_memory(marker, 3))
 """ % MCP_PATH,
+        "mcp-regex-escape-prefilter": r"""
+import importlib.util, re
+spec = importlib.util.spec_from_file_location('ovm', r'%s')
+m = importlib.util.module_from_spec(spec); spec.loader.exec_module(m)
+for pattern, text in [(r'error\x20timeout', 'error timeout'), (r'\u0061bcdef', 'abcdef')]:
+    literal = m._required_literal(pattern)
+    assert re.search(pattern, text, re.IGNORECASE) and literal in text.lower(), (pattern, literal)
+print('prefilter-ok')
+""" % MCP_PATH,
+        "mcp-window-case-insensitive": """
+import importlib.util, os, tempfile
+spec = importlib.util.spec_from_file_location('ovm', r'%s')
+m = importlib.util.module_from_spec(spec); spec.loader.exec_module(m)
+path = os.path.join(tempfile.mkdtemp(), 'note.md')
+with open(path, 'w', encoding='utf-8') as f:
+    f.write('intro line\\nDeploy NOTEBOOKLM Terminal flow\\n')
+query = 'notebooklm terminal'
+window = m._scan_file_window(path, query, query.encode('ascii'), len(query))
+assert window and 'NOTEBOOKLM Terminal' in window, window
+print('window-ok')
+""" % MCP_PATH,
+        "mcp-content-fts-id-hits": """
+import importlib.util, os, sqlite3, tempfile
+db = os.path.join(tempfile.mkdtemp(), 'aline.db')
+con = sqlite3.connect(db)
+con.executescript('''
+CREATE TABLE events(id TEXT, title TEXT, description TEXT, created_at TEXT);
+CREATE TABLE sessions(id TEXT, session_title TEXT, session_summary TEXT, session_type TEXT, created_at TEXT);
+CREATE TABLE turns(id TEXT, session_id TEXT, turn_number INT, llm_title TEXT, user_message TEXT, assistant_summary TEXT, created_at TEXT);
+CREATE TABLE turn_content(turn_id TEXT, content TEXT);
+CREATE VIRTUAL TABLE turn_content_fts USING fts5(content, content='turn_content', tokenize='trigram');
+''')
+con.execute("INSERT INTO turns VALUES('turn-fts-42', 'sess-fts', 1, 't', 'u', 'a', '2026-01-01T00:00:00')")
+con.execute("INSERT INTO turn_content VALUES('turn-fts-42', 'body without the id')")
+con.execute("INSERT INTO turn_content_fts(turn_content_fts) VALUES('rebuild')")
+con.commit(); con.close()
+spec = importlib.util.spec_from_file_location('ovm', r'%s')
+m = importlib.util.module_from_spec(spec); spec.loader.exec_module(m)
+m.ALINE_DB_PATH = db
+out = m._sqlite_search('turn-fts-42', 'content', 5, True)
+assert m._SQLITE_CONTENT_FTS and 'turn-fts-42' in out, out
+print('fts-id-ok')
+""" % MCP_PATH,
+        "daemon-evict-least-recent": """
+import importlib.util, os, sys
+spec = importlib.util.spec_from_file_location('vd', r'%s')
+sys.path.insert(0, os.path.dirname(spec.origin))  # the daemon imports memory_index from its own directory
+d = importlib.util.module_from_spec(spec); spec.loader.exec_module(d)
+store = d.SessionStore()
+store.mark_exported(store.add('old-exported', 'codex', 1.0))
+store.mark_exported(store.add('active-exported', 'codex', 2.0))
+store.touch(store.sid_to_idx['old-exported'], 3.0)
+store.touch(store.sid_to_idx['active-exported'], 4.0)
+store.evict_oldest()
+assert 'active-exported' in store and 'old-exported' not in store, store.ids
+print('evict-ok')
+""" % DAEMON_PATH,
+        "daemon-codex-resume-tail": """
+import importlib.util, json, os, sys, tempfile, time
+spec = importlib.util.spec_from_file_location('vd', r'%s')
+sys.path.insert(0, os.path.dirname(spec.origin))  # the daemon imports memory_index from its own directory
+d = importlib.util.module_from_spec(spec); spec.loader.exec_module(d)
+root = tempfile.mkdtemp()
+d.CODEX_SESSIONS = root
+d.ENABLE_CODEX_SESSION_MONITOR = True
+def line(text):
+    item = {'type': 'message', 'content': [{'type': 'output_text', 'text': text}]}
+    return json.dumps({'type': 'response_item', 'payload': item}) + '\\n'
+path = os.path.join(root, 'resumed.jsonl')
+with open(path, 'w') as f:
+    f.write(line('history before the daemon started'))
+os.utime(path, (time.time() - 7200,) * 2)
+tracker = d.SessionTracker()
+tracker.poll_codex_sessions()
+with open(path, 'a') as f:
+    f.write(line('resumed between scans'))
+tracker._last_codex_scan = 0
+tracker.poll_codex_sessions()
+idx = tracker.sessions.sid_to_idx.get('resumed.jsonl')
+messages = list(tracker.sessions.messages[idx]) if idx is not None else []
+assert any('resumed between scans' in msg for msg in messages), messages
+print('resume-ok')
+""" % DAEMON_PATH,
     }
     expected = {
         "mcp-health": '"all_ok": true',
         "mcp-long-query": "019cc215",
         "mcp-keyword": "NotebookLM".lower(),
         "mcp-memory-save-query": "regression-marker-",
+        "mcp-regex-escape-prefilter": "prefilter-ok",
+        "mcp-window-case-insensitive": "window-ok",
+        "mcp-content-fts-id-hits": "fts-id-ok",
+        "daemon-evict-least-recent": "evict-ok",
+        "daemon-codex-resume-tail": "resume-ok",
     }
 
     for name, code in snippets.items():
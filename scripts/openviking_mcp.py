@@ -1,18 +1,32 @@
 import atexit
+import concurrent.futures
 from datetime import datetime
+import functools
+import heapq
+import importlib.util
+import io
+import itertools
 import json
 import os
 import re
+import selectors
 import shutil
+import signal
 import sqlite3
 import subprocess
 import sys
 import time
 import threading
 from typing import Any
+import urllib.parse
 
 import httpx
 
+try:
+    import orjson as _orjson  # optional: faster parsing of OpenViking API responses
+except ImportError:
+    _orjson = None
+
 
 def _stderr(msg: str) -> None:
     try:
@@ -126,12 +140,23 @@ def _resolve_onecontext_db_path() -> str:
 ALINE_DB_PATH = _resolve_onecontext_db_path()
 VALID_SEARCH_TYPES = {"all", "event", "session", "turn", "content"}
 HTTP_TIMEOUT_SEC = max(int(os.environ.get("OPENVIKING_HTTP_TIMEOUT_SEC", "20")), 3)
-HTTP_CLIENT = httpx.Client(timeout=HTTP_TIMEOUT_SEC, trust_env=False, follow_redirects=False)
+# Multiplex concurrent tool calls over one connection when httpx[http2] is installed.
+_HTTP2_OK = importlib.util.find_spec("h2") is not None
+HTTP_CLIENT = httpx.Client(
+    timeout=HTTP_TIMEOUT_SEC,
+    trust_env=False,
+    follow_redirects=False,
+    http2=_HTTP2_OK,
+    limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=300.0),
+)
 atexit.register(HTTP_CLIENT.close)
 OPENVIKING_ROOT_URL = OPENVIKING_URL.split("/api/", 1)[0].rstrip("/")
 ONECONTEXT_CLI_TIMEOUT_SEC = max(2, int(os.environ.get("OPENVIKING_ONECONTEXT_CLI_TIMEOUT_SEC", "8")))
 ONECONTEXT_SEARCH_BUDGET_SEC = max(4, int(os.environ.get("OPENVIKING_ONECONTEXT_SEARCH_BUDGET_SEC", "18")))
 SQLITE_CONNECT_TIMEOUT_SEC = max(0.5, float(os.environ.get("OPENVIKING_SQLITE_CONNECT_TIMEOUT_SEC", "1.5")))
+OPENVIKING_SQLITE_ENSURE_INDEXES = str(
+    os.environ.get("OPENVIKING_SQLITE_ENSURE_INDEXES", "0")
+).strip().lower() in {"1", "true", "yes", "on"}
 OPENVIKING_ENABLE_SEMANTIC_QUERY = str(
     os.environ.get("OPENVIKING_ENABLE_SEMANTIC_QUERY", "0")
 ).strip().lower() in {"1", "true", "yes", "on"}
@@ -150,6 +175,9 @@ OPENVIKING_LOCAL_SCAN_READ_BYTES = max(
 OPENVIKING_HEALTH_CACHE_TTL_SEC = max(
     10, int(os.environ.get("OPENVIKING_HEALTH_CACHE_TTL_SEC", "120"))
 )
+RECALL_HEALTH_TIMEOUT_SEC = 12
+# Slightly above the slowest probe's own timeout so a healthy-but-slow recall still reports.
+HEALTH_PROBE_WAIT_SEC = RECALL_HEALTH_TIMEOUT_SEC + 3
 QUERY_STOPWORDS = {
     "a",
     "an",
@@ -199,9 +227,28 @@ def _resolve_recall_script() -> str:
 
 
 RECALL_SCRIPT_PATH = _resolve_recall_script()
-_LOCAL_SCAN_CACHE: dict[str, Any] = {"expires_at": 0.0, "files": [], "root_mtime": 0.0}
+_LOCAL_SCAN_SUFFIXES = (".md", ".txt", ".json", ".jsonl", ".log")
+# root -> (expires_at, root_mtime, [(path, mtime), ...]) sorted by mtime desc
+_LIST_CACHE: dict[str, tuple[float, float, list[tuple[str, float]]]] = {}
 _HEALTH_CACHE: dict[str, Any] = {"expires_at": 0.0, "payload": None}
+# CLI binaries that rejected the `search` subcommand; not worth a fork+exec on every query.
+_CLI_UNSUPPORTED: set[str] = set()
 _CACHE_LOCK = threading.Lock()
+_HEALTH_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=3, thread_name_prefix="health")
+atexit.register(_HEALTH_POOL.shutdown, wait=False)
+# Shared read-only connection for the sqlite fallback, keyed by (st_dev, st_ino) of the DB file.
+_SQLITE_CONN: sqlite3.Connection | None = None
+_SQLITE_CONN_KEY: tuple[int, int] | None = None
+# True when the DB carries a trigram FTS5 index over turn_content (see _detect_content_fts).
+_SQLITE_CONTENT_FTS = False
+_SQLITE_LOCK = threading.Lock()
+# Recency indexes for the fallback's ORDER BY created_at DESC LIMIT scans and the content JOIN.
+_SQLITE_FALLBACK_INDEXES: dict[str, str] = {
+    "idx_events_created": "CREATE INDEX IF NOT EXISTS idx_events_created ON events(created_at DESC)",
+    "idx_sessions_created": "CREATE INDEX IF NOT EXISTS idx_sessions_created ON sessions(created_at DESC)",
+    "idx_turns_created": "CREATE INDEX IF NOT EXISTS idx_turns_created ON turns(created_at DESC)",
+    "idx_turn_content_turn": "CREATE INDEX IF NOT EXISTS idx_turn_content_turn ON turn_content(turn_id)",
+}
 
 # ─── Intent Pre-filter (memU-inspired, zero network dependency) ───────────────
 # Exact no-retrieve token set – kept deliberately tight so we never drop a
@@ -232,6 +279,84 @@ _SOCIAL_ONLY_TAIL = re.compile(
     r"^(good\s*(morning|afternoon|evening|night)|morning|afternoon|evening|night|你好|嗨|哈喽|thanks?|thank you|谢谢|再见|拜拜|好的|ok|okay)[!,.，。！？?\s]*$",
     re.IGNORECASE,
 )
+_UUID_RE = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE)
+_DIGITS8_RE = re.compile(r"\d{8}")
+_SAFE_FN_RE = re.compile(r"[^a-zA-Z0-9._-]+")
+_WS_RE = re.compile(r"\s+")
+# Same character set as str.isalnum() (Unicode-aware), counted in one C-level pass.
+_ALNUM_RE = re.compile(r"[^\W_]")
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_user_regex(pattern: str, flags: int = re.IGNORECASE) -> re.Pattern[str]:
+    """Compile a caller-supplied pattern once; re.error propagates and is not cached."""
+    return re.compile(pattern, flags)
+
+
+_SINGLE_CHAR_ESCAPES = frozenset("dDsSwWbBAZ")
+
+
+def _required_literal(pattern: str) -> str:
+    """Longest ASCII alnum run (lowercased) every match of pattern must contain, or "" if unsure.
+
+    Deliberately conservative: alternation, group extensions and anything inside
+    groups or classes disable the prefilter rather than risk rejecting a real match.
+    """
+    if "|" in pattern or "(?" in pattern:
+        return ""
+    runs: list[str] = []
+    run = ""
+    depth = 0
+    i = 0
+    n = len(pattern)
+    while i < n:
+        ch = pattern[i]
+        if ch == "\\":
+            nxt = pattern[i + 1 : i + 2]
+            if nxt.isalnum() and nxt not in _SINGLE_CHAR_ESCAPES:
+                # \xHH, \uHHHH, \N{...}, octal, backrefs, \n ...: bail rather than parse them.
+                return ""
+            runs.append(run)
+            run = ""
+            i += 2
+            continue
+        if ch == "[":
+            j = i + 1
+            if j < n and pattern[j] == "^":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 2 if pattern[j] == "\\" else 1
+            if j >= n:
+                return ""
+            runs.append(run)
+            run = ""
+            i = j + 1
+            continue
+        if ch in "?*{":
+            # previous atom is optional
+            runs.append(run[:-1])
+            run = ""
+            if ch == "{":
+                close = pattern.find("}", i)
+                i = close + 1 if close > 0 else i + 1
+            else:
+                i += 1
+            continue
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth = max(0, depth - 1)
+        if depth == 0 and ch.isascii() and ch.isalnum():
+            run += ch
+        else:
+            runs.append(run)
+            run = ""
+        i += 1
+    runs.append(run)
+    best = max(runs, key=len)
+    return best.lower() if len(best) >= 3 else ""
 
 
 def _strip_social_prefixes(query: str) -> str:
@@ -287,24 +412,26 @@ def _resolve_search_type(search_type: str) -> str:
     return "all"
 
 
+_ONECONTEXT_ZERO_MATCH_MARKERS = ("Found 0 matches", "No matches found")
+# Only a no-match when the output is little more than the marker line itself.
+_ONECONTEXT_HEADER_MARKERS = (
+    "No matching messages found",
+    "Search Results for:",
+    "Regex Search:",
+    "Error searching:",
+    "no such column:",
+)
+
+
 def _onecontext_no_match(result_text: str) -> bool:
     if not result_text:
         return True
-    markers = [
-        "Found 0 matches",
-        "No matches found",
-        "No matching messages found",
-        "Search Results for:",
-        "Regex Search:",
-        "Error searching:",
-        "no such column:",
-    ]
     text = result_text.strip()
-    if any(marker in text for marker in markers):
+    if any(marker in text for marker in _ONECONTEXT_ZERO_MATCH_MARKERS):
+        return True
+    if any(marker in text for marker in _ONECONTEXT_HEADER_MARKERS):
         # "Search Results for: ..." or "Regex Search: ..." alone should be treated as no-match.
         # Otherwise the caller may stop early and skip useful fallback routes.
-        if "Found 0 matches" in text or "No matches found" in text:
-            return True
         compact_lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
         if len(compact_lines) <= 3:
             return True
@@ -317,14 +444,15 @@ def _looks_like_identifier_query(query: str) -> bool:
         return False
     if q.startswith("ctx-"):
         return True
-    if re.fullmatch(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", q, re.IGNORECASE):
+    if _UUID_RE.fullmatch(q):
         return True
-    if re.search(r"\d{8}", q) and ("-" in q or "_" in q):
+    if _DIGITS8_RE.search(q) and ("-" in q or "_" in q):
         return True
     # opaque IDs / tags are often dominated by digits + separators and are poor semantic queries
-    alnum = sum(ch.isalnum() for ch in q)
-    punct = sum(ch in "-_:" for ch in q)
-    return len(q) >= 12 and punct >= 2 and alnum >= 6
+    if len(q) < 12:
+        return False
+    punct = q.count("-") + q.count("_") + q.count(":")
+    return punct >= 2 and len(_ALNUM_RE.findall(q)) >= 6
 
 
 def _build_query_variants(query: str) -> list[str]:
@@ -370,7 +498,7 @@ def _build_query_variants(query: str) -> list[str]:
 
     variants: list[str] = []
     seen: set[str] = set()
-    compact = re.sub(r"\s+", " ", q).strip()
+    compact = _WS_RE.sub(" ", q).strip()
 
     m = re.fullmatch(r"\s*(\d{4})[-/](\d{1,2})[-/](\d{1,2})\s*", compact)
     if m:
@@ -394,6 +522,21 @@ def _build_query_variants(query: str) -> list[str]:
     return variants
 
 
+def _json_loads(data: bytes | str) -> Any:
+    if _orjson is not None:
+        return _orjson.loads(data)
+    return json.loads(data)
+
+
+def _dump_item(item: Any) -> str:
+    if _orjson is not None:
+        try:
+            return _orjson.dumps(item, option=_orjson.OPT_INDENT_2).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(item, ensure_ascii=False, indent=2)
+
+
 def _normalize_tags(tags: list[str] | str | None) -> list[str]:
     if tags is None:
         return []
@@ -414,15 +557,19 @@ def _normalize_tags(tags: list[str] | str | None) -> list[str]:
 
 
 def _safe_filename(value: str) -> str:
-    s = re.sub(r"[^a-zA-Z0-9._-]+", "_", (value or "").strip().lower())
+    s = _SAFE_FN_RE.sub("_", (value or "").strip().lower())
     s = s.strip("._-")
     return (s or "memory")[:120]
 
 
 def _secure_write_text(path: str, text: str) -> None:
+    data = memoryview(text.encode("utf-8"))
     fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
-    with os.fdopen(fd, "w", encoding="utf-8") as f:
-        f.write(text)
+    try:
+        while data:
+            data = data[os.write(fd, data) :]
+    finally:
+        os.close(fd)
 
 
 def _safe_mtime(path: str) -> float:
@@ -432,44 +579,79 @@ def _safe_mtime(path: str) -> float:
         return 0.0
 
 
-def _list_shared_files_cached(root: str) -> list[str]:
+def _iter_shared_files(root: str):
+    """Yield (path, mtime) for indexable files under root; DirEntry.stat() avoids extra stat calls."""
+    stack = [root]
+    while stack:
+        base = stack.pop()
+        try:
+            it = os.scandir(base)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                name = entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                        continue
+                    if name[0] == "." or not name.lower().endswith(_LOCAL_SCAN_SUFFIXES):
+                        continue
+                    mtime = entry.stat(follow_symlinks=False).st_mtime
+                except OSError:
+                    continue
+                yield entry.path, mtime
+
+
+def _clear_list_cache() -> None:
+    with _CACHE_LOCK:
+        _LIST_CACHE.clear()
+
+
+def _list_shared_files_cached(root: str) -> list[tuple[str, float]]:
     now = time.monotonic()
     root_mtime = _safe_mtime(root)
     with _CACHE_LOCK:
-        cached_files = _LOCAL_SCAN_CACHE.get("files", [])
-        if (
-            _LOCAL_SCAN_CACHE.get("expires_at", 0.0) > now
-            and float(_LOCAL_SCAN_CACHE.get("root_mtime", 0.0)) == float(root_mtime)
-            and cached_files
-        ):
-            return list(cached_files)
-
-    files: list[str] = []
-    reached_cap = False
-    for base, _, names in os.walk(root):
-        for name in names:
-            if name.startswith("."):
-                continue
-            if not name.lower().endswith((".md", ".txt", ".json", ".jsonl", ".log")):
-                continue
-            files.append(os.path.join(base, name))
-            if len(files) >= OPENVIKING_LOCAL_SCAN_HARD_CAP:
-                reached_cap = True
-                break
-        if reached_cap:
-            break
-
-    if files:
-        files.sort(key=_safe_mtime, reverse=True)
-        files = files[:OPENVIKING_LOCAL_SCAN_MAX_FILES]
+        cached = _LIST_CACHE.get(root)
+        if cached and cached[0] > now and cached[1] == root_mtime and cached[2]:
+            return list(cached[2])
+
+    # Keep only the newest MAX_FILES while walking (O(N log K)) instead of sorting every hit.
+    files = heapq.nlargest(
+        OPENVIKING_LOCAL_SCAN_MAX_FILES,
+        itertools.islice(_iter_shared_files(root), OPENVIKING_LOCAL_SCAN_HARD_CAP),
+        key=lambda item: item[1],
+    )
 
     with _CACHE_LOCK:
-        _LOCAL_SCAN_CACHE["files"] = list(files)
-        _LOCAL_SCAN_CACHE["root_mtime"] = float(root_mtime)
-        _LOCAL_SCAN_CACHE["expires_at"] = now + OPENVIKING_LOCAL_SCAN_CACHE_TTL_SEC
+        _LIST_CACHE[root] = (now + OPENVIKING_LOCAL_SCAN_CACHE_TTL_SEC, root_mtime, list(files))
     return files
 
 
+def _scan_file_window(path: str, ql: str, ql_bytes: bytes | None, qlen: int) -> str | None:
+    """Return the text around the first case-insensitive hit in path, or None."""
+    if ql_bytes is None:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            text = f.read(OPENVIKING_LOCAL_SCAN_READ_BYTES)
+        idx = text.lower().find(ql)
+        if idx < 0:
+            return None
+        return text[max(0, idx - 120) : min(len(text), idx + qlen + 120)]
+
+    with open(path, "rb") as f:
+        data = f.read(OPENVIKING_LOCAL_SCAN_READ_BYTES)
+    # bytes.lower() folds ASCII only, which is all an ASCII query needs.
+    start = data.lower().find(ql_bytes)
+    if start < 0:
+        return None
+    # 4 bytes per char covers the 120-char context even for multibyte text; the hit itself
+    # is ASCII, so splitting the decode at its edges never cuts a character.
+    end = start + len(ql_bytes)
+    before = data[max(0, start - 480) : start].decode("utf-8", errors="ignore")
+    after = data[end : end + 480].decode("utf-8", errors="ignore")
+    return before[-120:] + data[start:end].decode("ascii") + after[:120]
+
+
 def _local_exact_resource_matches(query: str, limit: int = 3) -> list[dict[str, Any]]:
     root = os.path.join(LOCAL_STORAGE_ROOT, "resources", "shared")
     if not os.path.isdir(root):
@@ -481,26 +663,37 @@ def _local_exact_resource_matches(query: str, limit: int = 3) -> list[dict[str,
 
     matches: list[dict[str, Any]] = []
     ql = query.lower()
+    # ASCII queries are matched on the raw bytes; others need the decoded text for case folding.
+    ql_bytes = ql.encode("ascii") if query.isascii() else None
 
-    for path in files:
+    # dirname -> (relative dir, query in relative dir). Files keep their mtime order; the
+    # relpath work and the ancestor-name check run once per directory instead of once per file.
+    dir_info: dict[str, tuple[str, bool]] = {}
+
+    for path, mtime in files:
         hit_in = None
         snippet = ""
-        rel_path = os.path.relpath(path, root)
-        if ql in rel_path.lower():
+        parent, name = os.path.split(path)
+        info = dir_info.get(parent)
+        if info is None:
+            rel_dir = os.path.relpath(parent, root)
+            rel_dir = "" if rel_dir == os.curdir else rel_dir + os.sep
+            info = dir_info[parent] = (rel_dir, ql in rel_dir.lower())
+        rel_dir, dir_hit = info
+        rel_path = rel_dir + name
+        # A directory-name hit covers every file below it; otherwise the query may still
+        # span the separator or sit in the file name.
+        if dir_hit or ql in rel_path.lower():
             hit_in = "path"
             snippet = rel_path
         else:
             try:
-                with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                    text = f.read(OPENVIKING_LOCAL_SCAN_READ_BYTES)
+                window = _scan_file_window(path, ql, ql_bytes, len(query))
             except Exception:
                 continue
-            idx = text.lower().find(ql)
-            if idx >= 0:
+            if window is not None:
                 hit_in = "content"
-                start = max(0, idx - 120)
-                end = min(len(text), idx + len(query) + 120)
-                snippet = re.sub(r"\s+", " ", text[start:end]).strip()
+                snippet = _WS_RE.sub(" ", window).strip()
 
         if hit_in:
             matches.append(
@@ -508,7 +701,7 @@ def _local_exact_resource_matches(query: str, limit: int = 3) -> list[dict[str,
                     "uri_hint": f"viking://resources/{rel_path.replace(os.sep, '/')}",
                     "file_path": path,
                     "matched_in": hit_in,
-                    "mtime": datetime.fromtimestamp(os.path.getmtime(path)).isoformat(),
+                    "mtime": datetime.fromtimestamp(mtime).isoformat(),
                     "snippet": snippet,
                 }
             )
@@ -521,39 +714,40 @@ def _local_exact_resource_matches(query: str, limit: int = 3) -> list[dict[str,
 def _build_snippet(text: str, query: str, use_regex: bool, radius: int = 80) -> str:
     if not text:
         return ""
-    compact = re.sub(r"\s+", " ", text).strip()
+    compact = _WS_RE.sub(" ", text).strip()
     if not compact:
         return ""
 
+    span: tuple[int, int] | None = None
     if use_regex and len(query) <= 200:
         try:
-            pattern = re.compile(query, re.IGNORECASE)
-            match = pattern.search(compact)
+            m = _compile_user_regex(query).search(compact)
         except re.error:
-            match = None
+            m = None
+        if m:
+            span = (m.start(), m.end())
     else:
         idx = compact.lower().find(query.lower())
-        if idx < 0:
-            match = None
-        else:
-            _s, _e = idx, idx + len(query)
-            match = type("_Span", (), {"start": staticmethod(lambda _s=_s: _s), "end": staticmethod(lambda _e=_e: _e)})()
+        if idx >= 0:
+            span = (idx, idx + len(query))
 
-    if not match:
+    if span is None:
         return compact[: radius * 2]
 
-    start = max(0, match.start() - radius)
-    end = min(len(compact), match.end() + radius)
+    start = max(0, span[0] - radius)
+    end = min(len(compact), span[1] + radius)
     return compact[start:end]
 
 
-def _try_cli_search(query: str, search_type: str, limit: int, no_regex: bool) -> str:
+@functools.lru_cache(maxsize=1)
+def _resolved_cli_candidates() -> tuple[str, ...]:
+    """Resolve onecontext CLI paths once per process (PATH lookups are not free per query)."""
     candidates = [
         os.environ.get("ONECONTEXT_BIN", ""),
         "onecontext",
         os.path.expanduser("~/.local/bin/onecontext"),
     ]
-
+    resolved: list[str] = []
     for candidate in candidates:
         if not candidate:
             continue
@@ -561,7 +755,87 @@ def _try_cli_search(query: str, search_type: str, limit: int, no_regex: bool) ->
             cmd_path = candidate if os.path.exists(candidate) else None
         else:
             cmd_path = shutil.which(candidate)
-        if not cmd_path:
+        if cmd_path and cmd_path not in resolved:
+            resolved.append(cmd_path)
+    return tuple(resolved)
+
+
+def _spawn_capture(argv: list[str], timeout: float) -> tuple[int, str, str]:
+    """Run argv and capture (returncode, stdout, stderr) like subprocess.run with a timeout.
+
+    Uses posix_spawn plus a selector over non-blocking pipes, skipping the Popen
+    machinery on every CLI probe. argv[0] must be a path (no PATH lookup). Raises
+    subprocess.TimeoutExpired after killing the child, OSError if it cannot start.
+    """
+    if not hasattr(os, "posix_spawn"):
+        result = subprocess.run(argv, capture_output=True, timeout=timeout)
+        return (
+            result.returncode,
+            result.stdout.decode("utf-8", "replace"),
+            result.stderr.decode("utf-8", "replace"),
+        )
+
+    out_r, out_w = os.pipe()
+    err_r, err_w = os.pipe()
+    try:
+        pid = os.posix_spawn(
+            argv[0],
+            argv,
+            os.environ,
+            file_actions=[(os.POSIX_SPAWN_DUP2, out_w, 1), (os.POSIX_SPAWN_DUP2, err_w, 2)],
+        )
+    except BaseException:
+        os.close(out_r)
+        os.close(err_r)
+        raise
+    finally:
+        os.close(out_w)
+        os.close(err_w)
+
+    deadline = time.monotonic() + timeout
+    chunks: dict[int, list[bytes]] = {out_r: [], err_r: []}
+    sel = selectors.DefaultSelector()
+    try:
+        for fd in chunks:
+            os.set_blocking(fd, False)
+            sel.register(fd, selectors.EVENT_READ)
+        while sel.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            for key, _ in sel.select(remaining):
+                try:
+                    data = os.read(key.fd, 65536)
+                except BlockingIOError:
+                    continue
+                if data:
+                    chunks[key.fd].append(data)
+                else:
+                    sel.unregister(key.fd)
+        # Both pipes closed (or time ran out): reap the child within what is left of the budget.
+        while True:
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if done:
+                break
+            if time.monotonic() >= deadline:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+                raise subprocess.TimeoutExpired(argv, timeout)
+            time.sleep(0.01)
+    finally:
+        sel.close()
+        os.close(out_r)
+        os.close(err_r)
+    return (
+        os.waitstatus_to_exitcode(status),
+        b"".join(chunks[out_r]).decode("utf-8", "replace"),
+        b"".join(chunks[err_r]).decode("utf-8", "replace"),
+    )
+
+
+def _try_cli_search(query: str, search_type: str, limit: int, no_regex: bool) -> str:
+    for cmd_path in _resolved_cli_candidates():
+        if cmd_path in _CLI_UNSUPPORTED:
             continue
 
         cmd = [cmd_path, "search", query, "-t", search_type, "-l", str(limit)]
@@ -569,20 +843,15 @@ def _try_cli_search(query: str, search_type: str, limit: int, no_regex: bool) ->
             cmd.append("--no-regex")
 
         try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=ONECONTEXT_CLI_TIMEOUT_SEC,
-            )
+            returncode, stdout, stderr = _spawn_capture(cmd, ONECONTEXT_CLI_TIMEOUT_SEC)
         except Exception:
             continue
 
-        stdout = (result.stdout or "").strip()
-        stderr = (result.stderr or "").strip()
+        stdout = stdout.strip()
+        stderr = stderr.strip()
 
         # newer aline help may hide subcommands but search still works; non-zero with no useful output -> try fallback
-        if result.returncode == 0 and stdout:
+        if returncode == 0 and stdout:
             return f"--- ONECONTEXT SEARCH RESULTS (cli: {os.path.basename(cmd_path)}) ---\n{stdout}"
 
         unknown_cmd_markers = [
@@ -591,6 +860,10 @@ def _try_cli_search(query: str, search_type: str, limit: int, no_regex: bool) ->
             "Usage:",
         ]
         if any(m in stderr for m in unknown_cmd_markers):
+            # "Usage:" may just be a bad argument for this query; only a missing subcommand is sticky.
+            if "No such command" in stderr or "Unknown command" in stderr:
+                with _CACHE_LOCK:
+                    _CLI_UNSUPPORTED.add(cmd_path)
             continue
 
         if stdout:
@@ -611,16 +884,11 @@ def _try_cli_search(query: str, search_type: str, limit: int, no_regex: bool) ->
         if no_regex:
             cmd.append("--no-regex")
         try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=ONECONTEXT_CLI_TIMEOUT_SEC,
-            )
+            returncode, stdout, _ = _spawn_capture(cmd, ONECONTEXT_CLI_TIMEOUT_SEC)
         except Exception:
             return ""
-        stdout = (result.stdout or "").strip()
-        if result.returncode == 0 and stdout and "No matches found" not in stdout:
+        stdout = stdout.strip()
+        if returncode == 0 and stdout and "No matches found" not in stdout:
             return f"--- ONECONTEXT SEARCH RESULTS (recall fallback) ---\n{stdout}"
 
     return ""
@@ -639,11 +907,8 @@ def _probe_recall_health() -> dict[str, Any]:
             _HEALTH_CACHE["expires_at"] = now + OPENVIKING_HEALTH_CACHE_TTL_SEC
         return payload
     try:
-        result = subprocess.run(
-            [sys.executable, RECALL_SCRIPT_PATH, "--health"],
-            capture_output=True,
-            text=True,
-            timeout=12,
+        returncode, stdout, stderr = _spawn_capture(
+            [sys.executable, RECALL_SCRIPT_PATH, "--health"], RECALL_HEALTH_TIMEOUT_SEC
         )
     except Exception as exc:
         payload = {"ok": False, "error": str(exc)}
@@ -652,9 +917,9 @@ def _probe_recall_health() -> dict[str, Any]:
             _HEALTH_CACHE["expires_at"] = now + OPENVIKING_HEALTH_CACHE_TTL_SEC
         return payload
 
-    output = (result.stdout or "").strip()
-    if result.returncode != 0:
-        payload = {"ok": False, "error": output or (result.stderr or "").strip()}
+    output = stdout.strip()
+    if returncode != 0:
+        payload = {"ok": False, "error": output or stderr.strip()}
         with _CACHE_LOCK:
             _HEALTH_CACHE["payload"] = payload
             _HEALTH_CACHE["expires_at"] = now + OPENVIKING_HEALTH_CACHE_TTL_SEC
@@ -685,8 +950,209 @@ def _probe_recall_health() -> dict[str, Any]:
     return payload
 
 
-def _sqlite_search(query: str, search_type: str, limit: int, no_regex: bool) -> str:
-    if not os.path.exists(ALINE_DB_PATH):
+# (kind, recency-window SELECT, LIKE haystack, window size from hard_limit). Every branch
+# yields the same columns: kind, id, session_id, turn_number, title, body, extra, created_at.
+_SQLITE_FALLBACK_BRANCHES: tuple[tuple[str, str, str, Any], ...] = (
+    (
+        "event",
+        """
+        SELECT 'event' AS kind, id, NULL AS session_id, NULL AS turn_number,
+               title, description AS body, NULL AS extra, created_at
+        FROM events
+        ORDER BY created_at DESC
+        LIMIT ?
+        """,
+        "(coalesce(id, '') || char(10) || coalesce(title, '') || char(10) || coalesce(body, ''))",
+        lambda hard_limit: hard_limit,
+    ),
+    (
+        "session",
+        """
+        SELECT 'session' AS kind, id, NULL AS session_id, NULL AS turn_number,
+               session_title AS title, session_summary AS body, session_type AS extra, created_at
+        FROM sessions
+        ORDER BY created_at DESC
+        LIMIT ?
+        """,
+        "(coalesce(id, '') || char(10) || coalesce(title, '') || char(10) || coalesce(body, ''))",
+        lambda hard_limit: hard_limit,
+    ),
+    (
+        "turn",
+        """
+        SELECT 'turn' AS kind, t.id, t.session_id, t.turn_number,
+               t.llm_title AS title, t.user_message AS body, t.assistant_summary AS extra, t.created_at
+        FROM turns t
+        ORDER BY t.created_at DESC
+        LIMIT ?
+        """,
+        "(coalesce(id, '') || char(10) || coalesce(session_id, '') || char(10) || coalesce(title, '')"
+        " || char(10) || coalesce(body, '') || char(10) || coalesce(extra, ''))",
+        lambda hard_limit: hard_limit * 2,
+    ),
+    (
+        "content",
+        """
+        SELECT 'content' AS kind, tc.turn_id AS id, t.session_id, t.turn_number,
+               NULL AS title, substr(tc.content, 1, 60000) AS body, NULL AS extra, t.created_at
+        FROM turn_content tc
+        JOIN turns t ON t.id = tc.turn_id
+        ORDER BY t.created_at DESC
+        LIMIT ?
+        """,
+        "(coalesce(id, '') || char(10) || coalesce(session_id, '') || char(10) || coalesce(body, ''))",
+        lambda hard_limit: max(hard_limit, 40),
+    ),
+)
+
+# Content branch used instead of the recency scan when a trigram turn_content_fts index exists
+# (schema in README): matching rows come straight from the index, so the window holds the most
+# recent matches. The index only covers content, so turn/session id hits from the usual
+# recency window are UNION-ed back in.
+_SQLITE_CONTENT_FTS_SQL = """
+        SELECT 'content' AS kind, tc.turn_id AS id, t.session_id, t.turn_number,
+               NULL AS title, substr(tc.content, 1, 60000) AS body, NULL AS extra, t.created_at
+        FROM turn_content tc
+        JOIN turns t ON t.id = tc.turn_id
+        WHERE tc.rowid IN (
+            SELECT rowid FROM turn_content_fts WHERE turn_content_fts MATCH ?
+            UNION
+            SELECT rid FROM (
+                SELECT tc2.rowid AS rid, tc2.turn_id, t2.session_id
+                FROM turn_content tc2
+                JOIN turns t2 ON t2.id = tc2.turn_id
+                ORDER BY t2.created_at DESC
+                LIMIT ?
+            )
+            WHERE turn_id LIKE ? ESCAPE '\\' OR session_id LIKE ? ESCAPE '\\'
+        )
+        ORDER BY t.created_at DESC
+        LIMIT ?
+        """
+_FTS_CONTENT_OPT_RE = re.compile(r"content\s*=\s*['\"]?turn_content['\"]?", re.IGNORECASE)
+
+# kind -> row -> (match text, display title)
+_SQLITE_ROW_FORMATTERS = {
+    "event": lambda r: (
+        f"{r['id'] or ''}\n{r['title'] or ''}\n{r['body'] or ''}",
+        r["title"] or "",
+    ),
+    "session": lambda r: (
+        f"{r['id'] or ''}\n{r['title'] or ''}\n{r['body'] or ''}",
+        f"{r['extra']} | {(r['title'] or '').strip()}",
+    ),
+    "turn": lambda r: (
+        f"{r['id'] or ''}\n{r['session_id'] or ''}\n{r['title'] or ''}\n{r['body'] or ''}\n{r['extra'] or ''}",
+        f"session={r['session_id']} turn={r['turn_number']}",
+    ),
+    "content": lambda r: (
+        f"{r['id'] or ''}\n{r['session_id'] or ''}\n{r['body'] or ''}",
+        f"session={r['session_id']} turn={r['turn_number']}",
+    ),
+}
+
+
+def _close_sqlite_conn() -> None:
+    global _SQLITE_CONN, _SQLITE_CONN_KEY, _SQLITE_CONTENT_FTS
+    conn, _SQLITE_CONN, _SQLITE_CONN_KEY = _SQLITE_CONN, None, None
+    _SQLITE_CONTENT_FTS = False
+    if conn is not None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def _ensure_sqlite_indexes() -> None:
+    """Create missing fallback indexes in the OneContext history DB (opt-in, run at startup).
+
+    The DB belongs to the OneContext writer, so this only adds IF NOT EXISTS
+    indexes, never touches user_version, and gives up quietly when the DB is
+    locked or not writable. Searches never call it: their connection stays read-only.
+    """
+    if not os.path.isfile(ALINE_DB_PATH):
+        return
+    try:
+        rw = sqlite3.connect(ALINE_DB_PATH, timeout=SQLITE_CONNECT_TIMEOUT_SEC)
+    except sqlite3.Error:
+        return
+    try:
+        existing = {
+            row[0]
+            for row in rw.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall()
+        }
+        for name, sql in _SQLITE_FALLBACK_INDEXES.items():
+            if name in existing:
+                continue
+            try:
+                rw.execute(sql)
+            except sqlite3.OperationalError as exc:
+                # Missing table/column on older schemas, or the writer holds the lock.
+                _stderr(f"[openviking-mcp] sqlite index skipped: {exc}")
+        rw.commit()
+    except sqlite3.Error:
+        pass
+    finally:
+        rw.close()
+
+
+def _detect_content_fts(conn: sqlite3.Connection) -> bool:
+    """Whether turn_content_fts is an external-content trigram FTS5 index over turn_content.
+
+    Only that shape gives MATCH the same substring semantics as the LIKE scan and
+    rowids that join back to turn_content. The table is never created here: it needs
+    sync triggers on the OneContext writer's tables, so it stays an operator opt-in (README).
+    """
+    try:
+        row = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'turn_content_fts'"
+        ).fetchone()
+    except sqlite3.Error:
+        return False
+    sql = (row[0] or "").lower() if row else ""
+    return (
+        "fts5" in sql
+        and "trigram" in sql
+        and "content_rowid" not in sql
+        and bool(_FTS_CONTENT_OPT_RE.search(sql))
+    )
+
+
+def _get_sqlite_conn(db_key: tuple[int, int]) -> sqlite3.Connection:
+    """Return the shared read-only connection; caller must hold _SQLITE_LOCK."""
+    global _SQLITE_CONN, _SQLITE_CONN_KEY, _SQLITE_CONTENT_FTS
+    if _SQLITE_CONN is not None and _SQLITE_CONN_KEY == db_key:
+        return _SQLITE_CONN
+    # DB file was replaced (or first use): drop the stale handle and reopen.
+    _close_sqlite_conn()
+    conn = sqlite3.connect(
+        f"file:{urllib.parse.quote(ALINE_DB_PATH)}?mode=ro",
+        uri=True,
+        timeout=SQLITE_CONNECT_TIMEOUT_SEC,
+        check_same_thread=False,
+    )
+    try:
+        conn.row_factory = sqlite3.Row
+        # Read-only query path: reduce lock contention with active writer processes.
+        conn.execute("PRAGMA query_only=1")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA cache_size=-20000")
+        content_fts = _detect_content_fts(conn)
+    except Exception:
+        conn.close()
+        raise
+    _SQLITE_CONN, _SQLITE_CONN_KEY, _SQLITE_CONTENT_FTS = conn, db_key, content_fts
+    return conn
+
+
+atexit.register(_close_sqlite_conn)
+
+
+def _sqlite_search(query: str, search_type: str, limit: int, no_regex: bool, deadline: float | None = None) -> str:
+    try:
+        db_stat = os.stat(ALINE_DB_PATH)
+    except OSError:
         return f"OneContext fallback failed: DB not found at {ALINE_DB_PATH}"
 
     use_regex = not no_regex
@@ -697,134 +1163,83 @@ def _sqlite_search(query: str, search_type: str, limit: int, no_regex: bool) ->
             use_regex = False
         else:
             try:
-                regex_obj = re.compile(query, re.IGNORECASE)
+                regex_obj = _compile_user_regex(query)
             except re.error as exc:
                 return f"OneContext fallback failed: invalid regex `{query}` ({exc})"
 
+    # Cheap substring gate so most non-matching rows never reach the regex engine.
+    required_lit = _required_literal(query) if regex_obj is not None else ""
+    query_lower = query.lower()
+
     def _matched(text: str) -> bool:
         if not text:
             return False
         if use_regex:
+            if required_lit and required_lit not in text.lower():
+                return False
             return bool(regex_obj.search(text))
-        return query.lower() in text.lower()
+        return query_lower in text.lower()
 
     results: list[dict[str, Any]] = []
     hard_limit = max(limit, 1) * 8
-
-    conn = None
+    # SQLite LIKE only folds ASCII case, so push down only queries it compares the same way.
+    like_arg = None
+    if not use_regex and all(ch.isascii() or ch.lower() == ch.upper() for ch in query):
+        like_arg = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+    # Waiting on another search's query must not outlast this search's own budget.
+    if deadline is None:
+        deadline = time.monotonic() + ONECONTEXT_SEARCH_BUDGET_SEC
+    if not _SQLITE_LOCK.acquire(timeout=max(0.0, deadline - time.monotonic())):
+        return "No matches found in OneContext history (sqlite fallback busy, search budget exhausted)."
     try:
-        conn = sqlite3.connect(ALINE_DB_PATH, timeout=SQLITE_CONNECT_TIMEOUT_SEC)
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        # Read-only query path: reduce lock contention with active writer processes.
-        cur.execute("PRAGMA query_only=1")
-
-        if search_type in ("all", "event"):
-            rows = cur.execute(
-                """
-                SELECT id, title, description, created_at
-                FROM events
-                ORDER BY created_at DESC
-                LIMIT ?
-                """,
-                (hard_limit,),
-            ).fetchall()
-            for r in rows:
-                text = f"{r['id'] or ''}\n{r['title'] or ''}\n{r['description'] or ''}"
-                if _matched(text):
-                    results.append(
-                        {
-                            "type": "event",
-                            "id": r["id"],
-                            "title": r["title"] or "",
-                            "snippet": _build_snippet(text, query, use_regex),
-                        }
-                    )
-
-        if search_type in ("all", "session"):
-            rows = cur.execute(
-                """
-                SELECT id, session_type, session_title, session_summary, created_at
-                FROM sessions
-                ORDER BY created_at DESC
-                LIMIT ?
-                """,
-                (hard_limit,),
-            ).fetchall()
-            for r in rows:
-                text = f"{r['id'] or ''}\n{r['session_title'] or ''}\n{r['session_summary'] or ''}"
-                if _matched(text):
-                    results.append(
-                        {
-                            "type": "session",
-                            "id": r["id"],
-                            "title": f"{r['session_type']} | {(r['session_title'] or '').strip()}",
-                            "snippet": _build_snippet(text, query, use_regex),
-                        }
-                    )
-
-        if search_type in ("all", "turn"):
-            rows = cur.execute(
-                """
-                SELECT t.id, t.session_id, t.turn_number, t.llm_title, t.user_message, t.assistant_summary
-                FROM turns t
-                ORDER BY t.created_at DESC
-                LIMIT ?
-                """,
-                (hard_limit * 2,),
-            ).fetchall()
-            for r in rows:
-                text = (
-                    f"{r['id'] or ''}\n{r['session_id'] or ''}\n"
-                    f"{r['llm_title'] or ''}\n{r['user_message'] or ''}\n{r['assistant_summary'] or ''}"
-                )
-                if _matched(text):
-                    results.append(
-                        {
-                            "type": "turn",
-                            "id": r["id"],
-                            "title": f"session={r['session_id']} turn={r['turn_number']}",
-                            "snippet": _build_snippet(text, query, use_regex),
-                        }
-                    )
-
-        if search_type in ("all", "content"):
-            rows = cur.execute(
-                """
-                SELECT tc.turn_id, t.session_id, t.turn_number, substr(tc.content, 1, 60000) AS content_excerpt
-                FROM turn_content tc
-                JOIN turns t ON t.id = tc.turn_id
-                ORDER BY t.created_at DESC
-                LIMIT ?
-                """,
-                (max(hard_limit, 40),),
-            ).fetchall()
-            for r in rows:
-                text = f"{r['turn_id'] or ''}\n{r['session_id'] or ''}\n{r['content_excerpt'] or ''}"
-                if _matched(text):
-                    results.append(
-                        {
-                            "type": "content",
-                            "id": r["turn_id"],
-                            "title": f"session={r['session_id']} turn={r['turn_number']}",
-                            "snippet": _build_snippet(text, query, use_regex, radius=120),
-                        }
-                    )
+        cur = _get_sqlite_conn((db_stat.st_dev, db_stat.st_ino)).cursor()
+
+        # One UNION ALL statement instead of one round-trip per table. Each branch keeps its own
+        # recency window; literal queries are also filtered inside SQLite so only candidate rows
+        # cross into Python, while _matched() still has the final say.
+        parts: list[str] = []
+        params: list[Any] = []
+        for order, (kind, sql, haystack, window) in enumerate(_SQLITE_FALLBACK_BRANCHES):
+            if search_type not in ("all", kind):
+                continue
+            if kind == "content" and _SQLITE_CONTENT_FTS and like_arg is not None and len(query) >= 3:
+                # Trigram phrase MATCH is a case-insensitive substring test (>= 3 chars).
+                sql = _SQLITE_CONTENT_FTS_SQL
+                params.extend(('"' + query.replace('"', '""') + '"', window(hard_limit), like_arg, like_arg))
+            part = f"SELECT {order} AS kind_order, * FROM ({sql})"
+            params.append(window(hard_limit))
+            if like_arg is not None:
+                part += f" WHERE {haystack} LIKE ? ESCAPE '\\'"
+                params.append(like_arg)
+            parts.append(part)
+        rows = cur.execute(" UNION ALL ".join(parts) + " ORDER BY kind_order, created_at DESC", params).fetchall()
+
+        for r in rows:
+            kind = r["kind"]
+            text, title = _SQLITE_ROW_FORMATTERS[kind](r)
+            if _matched(text):
+                # Snippets (whitespace compaction + case folding of up to 60KB) are built
+                # below for displayed rows only; the rest just count toward the total.
+                results.append({"type": kind, "id": r["id"], "title": title, "text": text})
     except Exception as exc:
+        if isinstance(exc, sqlite3.Error):
+            _close_sqlite_conn()
         return f"OneContext fallback failed: sqlite query error ({exc})"
     finally:
-        if conn:
-            conn.close()
+        _SQLITE_LOCK.release()
 
     if not results:
         return "No matches found in OneContext history (sqlite fallback)."
 
-    lines = [f"--- ONECONTEXT SEARCH RESULTS (sqlite fallback: {ALINE_DB_PATH}) ---"]
+    buf = io.StringIO()
+    buf.write(f"--- ONECONTEXT SEARCH RESULTS (sqlite fallback: {ALINE_DB_PATH}) ---\n")
     for item in results[:limit]:
-        lines.append(f"[{item['type']}] {item['id']} | {item['title']}")
-        lines.append(f"  {item['snippet']}")
-    lines.append(f"\nFound {len(results)} matches (showing up to {limit}).")
-    return "\n".join(lines)
+        radius = 120 if item["type"] == "content" else 80
+        snippet = _build_snippet(item["text"], query, use_regex, radius=radius)
+        buf.write(f"[{item['type']}] {item['id']} | {item['title']}\n  {snippet}\n")
+    buf.write(f"\nFound {len(results)} matches (showing up to {limit}).")
+    return buf.getvalue()
 
 
 @mcp.tool()
@@ -886,7 +1301,7 @@ def query_viking_memory(query: str, limit: int = 3) -> str:
     if exact_matches:
         output.append("--- LOCAL MEMORY MATCHES ---")
         for item in exact_matches:
-            output.append(json.dumps(item, ensure_ascii=False, indent=2))
+            output.append(_dump_item(item))
         return "\n".join(output)
 
     # Keep previous semantic behavior optional; do not require it.
@@ -897,20 +1312,20 @@ def query_viking_memory(query: str, limit: int = 3) -> str:
             "limit": safe_limit,
         }
         try:
-            response = HTTP_CLIENT.post(f"{OPENVIKING_URL}/search/find", json=payload)
-            response.raise_for_status()
-            data = response.json()
+            with HTTP_CLIENT.stream("POST", f"{OPENVIKING_URL}/search/find", json=payload) as response:
+                response.raise_for_status()
+                data = _json_loads(response.read())
             if data.get("status") == "ok":
                 resources = data.get("result", {}).get("resources", [])
                 memories = data.get("result", {}).get("memories", [])
                 if resources:
                     output.append("--- FOUND RESOURCES ---")
                     for r in resources:
-                        output.append(json.dumps(r, ensure_ascii=False, indent=2))
+                        output.append(_dump_item(r))
                 if memories:
                     output.append("--- FOUND MEMORIES ---")
                     for m in memories:
-                        output.append(json.dumps(m, ensure_ascii=False, indent=2))
+                        output.append(_dump_item(m))
                 if output:
                     return "\n".join(output)
         except Exception:
@@ -939,7 +1354,7 @@ def search_onecontext_history(query: str, search_type: str = "all", limit: int =
     started_at = time.monotonic()
 
     # For date-like inputs, literal search tends to be significantly more stable.
-    date_like = any(re.fullmatch(r"\d{8}", v) for v in query_variants)
+    date_like = any(_DIGITS8_RE.fullmatch(v) for v in query_variants)
     prefer_literal_first = date_like and not no_regex
 
     def _try_cli_many(qs: list[str], stype: str, literal: bool) -> str:
@@ -955,7 +1370,7 @@ def search_onecontext_history(query: str, search_type: str = "all", limit: int =
         for q in qs:
             if time.monotonic() - started_at >= ONECONTEXT_SEARCH_BUDGET_SEC:
                 break
-            r = _sqlite_search(q, stype, safe_limit, literal)
+            r = _sqlite_search(q, stype, safe_limit, literal, started_at + ONECONTEXT_SEARCH_BUDGET_SEC)
             if not _onecontext_no_match(r):
                 return r
         return ""
@@ -1040,6 +1455,21 @@ def search_onecontext_history(query: str, search_type: str = "all", limit: int =
     )
 
 
+def _probe_onecontext_compat() -> dict[str, Any]:
+    onecontext_bin = shutil.which("onecontext") or os.path.expanduser("~/.local/bin/onecontext")
+    onecontext_ok = bool(onecontext_bin and os.path.exists(onecontext_bin))
+    return {"ok": onecontext_ok, "bin": onecontext_bin if onecontext_ok else None}
+
+
+def _probe_openviking_optional() -> dict[str, Any]:
+    # Optional probe only; do not fail whole health if old stack is down.
+    try:
+        resp = HTTP_CLIENT.get(f"{OPENVIKING_ROOT_URL}/health", timeout=3)
+        return {"ok": resp.status_code == 200, "status_code": resp.status_code}
+    except Exception as exc:
+        return {"ok": False, "error": str(exc)}
+
+
 @mcp.tool()
 def context_system_health() -> str:
     """
@@ -1052,22 +1482,27 @@ def context_system_health() -> str:
         "openviking_optional": {"ok": False},
     }
 
-    report["recall_lite"] = _probe_recall_health()
-
-    onecontext_bin = shutil.which("onecontext") or os.path.expanduser("~/.local/bin/onecontext")
-    onecontext_ok = bool(onecontext_bin and os.path.exists(onecontext_bin))
-    report["onecontext_compat"] = {"ok": onecontext_ok, "bin": onecontext_bin if onecontext_ok else None}
-
-    # Optional probe only; do not fail whole health if old stack is down.
-    try:
-        resp = HTTP_CLIENT.get(f"{OPENVIKING_ROOT_URL}/health", timeout=3)
-        report["openviking_optional"] = {"ok": resp.status_code == 200, "status_code": resp.status_code}
-    except Exception as exc:
-        report["openviking_optional"] = {"ok": False, "error": str(exc)}
+    # Probes are independent; run them together so latency is the slowest one, not the sum.
+    futures = {
+        "recall_lite": _HEALTH_POOL.submit(_probe_recall_health),
+        "onecontext_compat": _HEALTH_POOL.submit(_probe_onecontext_compat),
+        "openviking_optional": _HEALTH_POOL.submit(_probe_openviking_optional),
+    }
+    concurrent.futures.wait(futures.values(), timeout=HEALTH_PROBE_WAIT_SEC)
+    for name, fut in futures.items():
+        if not fut.done():
+            report[name] = {"ok": False, "error": f"probe timed out after {HEALTH_PROBE_WAIT_SEC}s"}
+            continue
+        try:
+            report[name] = fut.result()
+        except Exception as exc:
+            report[name] = {"ok": False, "error": str(exc)}
 
     report["all_ok"] = bool(report["recall_lite"].get("ok") and report["onecontext_compat"].get("ok"))
     return json.dumps(report, ensure_ascii=False, indent=2)
 
 
 if __name__ == "__main__":
+    if OPENVIKING_SQLITE_ENSURE_INDEXES:
+        _ensure_sqlite_indexes()
     mcp.run(transport="stdio")
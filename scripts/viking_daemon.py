@@ -8,12 +8,17 @@ Goals:
 - Safe long-running behavior (bounded memory, rotating logs, retries)
 """
 
+import functools
 import glob
 import hashlib
+import heapq
+import importlib.util
+import itertools
 import json
 import logging
 import logging.handlers
 import os
+import queue
 import re
 import stat
 import subprocess
@@ -25,10 +30,21 @@ except ImportError:
     _resource_mod = None  # type: ignore[assignment]
 import signal
 import sys
+import threading
 import time
-from datetime import datetime
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any
+
+try:
+    import orjson as _orjson  # optional: faster decoding of session JSONL lines
+except ImportError:
+    _orjson = None
+try:
+    import re2 as _re2  # optional (google-re2): linear-time secret redaction
+except ImportError:
+    _re2 = None
 try:
     from memory_index import strip_private_blocks, sync_index_from_storage
 except Exception:  # pragma: no cover - module import path compatibility
@@ -51,7 +67,10 @@ LOCAL_STORAGE_ROOT = Path(
         os.environ.get("OPENVIKING_STORAGE_ROOT", str(Path.home() / ".unified_context_data")),
     )
 ).expanduser()
-PENDING_DIR = LOCAL_STORAGE_ROOT / "resources" / "shared" / "history" / ".pending"
+HISTORY_DIR = LOCAL_STORAGE_ROOT / "resources" / "shared" / "history"
+PENDING_DIR = HISTORY_DIR / ".pending"
+# The in-memory pending-file count is re-read from disk at least this often to heal drift.
+PENDING_COUNT_RESYNC_SEC = 600
 
 # Security: verify storage root is not a symlink and is owned by current user
 if LOCAL_STORAGE_ROOT.exists():
@@ -102,8 +121,11 @@ LOOP_JITTER_SEC = max(0.0, float(os.environ.get("VIKING_LOOP_JITTER_SEC", "0.7")
 INDEX_SYNC_MIN_INTERVAL_SEC = max(5, int(os.environ.get("VIKING_INDEX_SYNC_MIN_INTERVAL_SEC", "20")))
 MAX_TRACKED_SESSIONS = int(os.environ.get("VIKING_MAX_TRACKED_SESSIONS", "240"))
 MAX_FILE_CURSORS = int(os.environ.get("VIKING_MAX_FILE_CURSORS", "800"))
+MAX_OPEN_TAIL_FILES = max(1, int(os.environ.get("VIKING_MAX_OPEN_TAIL_FILES", "64")))
+# After an in-place truncation, replay at most this many trailing bytes instead of the whole file.
+TRUNCATE_REPLAY_BYTES = 256 * 1024
 SESSION_TTL_SEC = int(os.environ.get("VIKING_SESSION_TTL_SEC", "7200"))
-MAX_MESSAGES_PER_SESSION = int(os.environ.get("VIKING_MAX_MESSAGES_PER_SESSION", "500"))
+MAX_MESSAGES_PER_SESSION = max(60, int(os.environ.get("VIKING_MAX_MESSAGES_PER_SESSION", "500")))
 EXPORT_HTTP_TIMEOUT_SEC = max(5, int(os.environ.get("VIKING_EXPORT_HTTP_TIMEOUT_SEC", "30")))
 PENDING_HTTP_TIMEOUT_SEC = max(5, int(os.environ.get("VIKING_PENDING_HTTP_TIMEOUT_SEC", "15")))
 MAX_CLAUDE_TRANSCRIPT_FILES_PER_POLL = max(
@@ -116,6 +138,8 @@ CLAUDE_TRANSCRIPT_SCAN_INTERVAL_SEC = max(
     30, int(os.environ.get("VIKING_CLAUDE_TRANSCRIPT_SCAN_INTERVAL_SEC", "180"))
 )
 ANTIGRAVITY_SCAN_INTERVAL_SEC = max(15, int(os.environ.get("VIKING_ANTIGRAVITY_SCAN_INTERVAL_SEC", "120")))
+# Source candidates seen missing are not re-stat'ed until this long has passed.
+SOURCE_MISSING_RECHECK_SEC = max(0, int(os.environ.get("VIKING_SOURCE_MISSING_RECHECK_SEC", "600")))
 MAX_CODEX_SESSION_FILES_PER_SCAN = max(
     100, int(os.environ.get("VIKING_MAX_CODEX_SESSION_FILES_PER_SCAN", "1200"))
 )
@@ -193,31 +217,92 @@ SOURCE_MONITOR_FLAGS: dict[str, bool] = {
 }
 
 SHELL_LINE_RE = re.compile(r"^:\s*(\d+):\d+;(.*)$")
+
+
+def _compile_secret(pattern: str, flags: int = 0):
+    """Compile a redaction pattern with re2 (linear-time, no backtracking) when installed."""
+    if _re2 is not None:
+        try:
+            return _re2.compile(("(?i)" if flags & re.IGNORECASE else "") + pattern)
+        except Exception:
+            pass
+    return re.compile(pattern, flags)
+
+
 SECRET_REPLACEMENTS = [
-    (re.compile(r"(api[_-]?key\s*[=:]\s*)([^\s\"']+)", re.IGNORECASE), r"\1***"),
-    (re.compile(r"(token\s*[=:]\s*)([^\s\"']+)", re.IGNORECASE), r"\1***"),
-    (re.compile(r"(password\s*[=:]\s*)([^\s\"']+)", re.IGNORECASE), r"\1***"),
-    (re.compile(r"(secret\s*[=:]\s*)([^\s\"']+)", re.IGNORECASE), r"\1***"),
-    (re.compile(r"(--api-key\s+)([^\s]+)", re.IGNORECASE), r"\1***"),
-    (re.compile(r"(--token\s+)([^\s]+)", re.IGNORECASE), r"\1***"),
-    (re.compile(r"(Authorization\s*:\s*Bearer\s+)([^\s\"']+)", re.IGNORECASE), r"\1***"),
-    (re.compile(r"\bsk-[A-Za-z0-9_-]{16,}\b"), "sk-***"),
-    (re.compile(r"\bsk-proj-[A-Za-z0-9_-]{16,}\b"), "sk-proj-***"),
-    (re.compile(r"\bghp_[A-Za-z0-9]{20,}\b"), "ghp_***"),
-    (re.compile(r"\bgho_[A-Za-z0-9]{20,}\b"), "gho_***"),
-    (re.compile(r"\bAIza[A-Za-z0-9_-]{20,}\b"), "AIza***"),
+    (_compile_secret(r"(api[_-]?key\s*[=:]\s*)([^\s\"']+)", re.IGNORECASE), r"\1***"),
+    (_compile_secret(r"(token\s*[=:]\s*)([^\s\"']+)", re.IGNORECASE), r"\1***"),
+    (_compile_secret(r"(password\s*[=:]\s*)([^\s\"']+)", re.IGNORECASE), r"\1***"),
+    (_compile_secret(r"(secret\s*[=:]\s*)([^\s\"']+)", re.IGNORECASE), r"\1***"),
+    (_compile_secret(r"(--api-key\s+)([^\s]+)", re.IGNORECASE), r"\1***"),
+    (_compile_secret(r"(--token\s+)([^\s]+)", re.IGNORECASE), r"\1***"),
+    (_compile_secret(r"(Authorization\s*:\s*Bearer\s+)([^\s\"']+)", re.IGNORECASE), r"\1***"),
+    (_compile_secret(r"\bsk-[A-Za-z0-9_-]{16,}\b"), "sk-***"),
+    (_compile_secret(r"\bsk-proj-[A-Za-z0-9_-]{16,}\b"), "sk-proj-***"),
+    (_compile_secret(r"\bghp_[A-Za-z0-9]{20,}\b"), "ghp_***"),
+    (_compile_secret(r"\bgho_[A-Za-z0-9]{20,}\b"), "gho_***"),
+    (_compile_secret(r"\bAIza[A-Za-z0-9_-]{20,}\b"), "AIza***"),
     # Slack tokens
-    (re.compile(r"\bxox[bprs]-[A-Za-z0-9\-]{10,}\b"), "xox?-***"),
+    (_compile_secret(r"\bxox[bprs]-[A-Za-z0-9\-]{10,}\b"), "xox?-***"),
     # AWS access keys
-    (re.compile(r"\b(?:AKIA|ASIA)[A-Z0-9]{12,}\b"), "AKIA***"),
+    (_compile_secret(r"\b(?:AKIA|ASIA)[A-Z0-9]{12,}\b"), "AKIA***"),
     # PEM private key blocks
-    (re.compile(r"-----BEGIN [A-Z ]*PRIVATE KEY-----[\s\S]*?-----END [A-Z ]*PRIVATE KEY-----"), "***PEM_KEY_REDACTED***"),
+    (_compile_secret(r"-----BEGIN [A-Z ]*PRIVATE KEY-----[\s\S]*?-----END [A-Z ]*PRIVATE KEY-----"), "***PEM_KEY_REDACTED***"),
+]
+# Every SECRET_REPLACEMENTS pattern needs at least one of these literals ("sk-" also covers
+# sk-proj-, "--" the long options and PEM armour), so text without any of them is clean.
+_SECRET_MARKERS = ("=", ":", "--", "sk-", "ghp_", "gho_", "AIza", "xox", "AKIA", "ASIA")
+# Literals each SECRET_REPLACEMENTS pattern cannot match without (one entry per pattern, same
+# order); a pattern only runs when one of its literals is present. Case-insensitive patterns
+# are gated on a folded copy computed once: no replacement inserts any of those literals,
+# so it never goes stale in a way that would skip a match.
+_SECRET_GATES: list[tuple[tuple[str, ...], bool]] = [
+    (("api",), True),
+    (("token",), True),
+    (("password",), True),
+    (("secret",), True),
+    (("--api-key",), True),
+    (("--token",), True),
+    (("bearer",), True),
+    (("sk-",), False),
+    (("sk-proj-",), False),
+    (("ghp_",), False),
+    (("gho_",), False),
+    (("AIza",), False),
+    (("xox",), False),
+    (("AKIA", "ASIA"), False),
+    (("-----BEGIN ",), False),
 ]
+# Non-ASCII letters that IGNORECASE matching treats as equal to an ASCII gate letter.
+_SECRET_FOLD = str.maketrans({"\u0130": "i", "\u0131": "i", "\u017f": "s", "\u212a": "k"})
+
+
+def _sanitize(text: str) -> str:
+    out = strip_private_blocks(text).strip()
+    if any(marker in out for marker in _SECRET_MARKERS):
+        folded = out.translate(_SECRET_FOLD).lower()
+        for (pattern, repl), (literals, fold) in zip(SECRET_REPLACEMENTS, _SECRET_GATES):
+            haystack = folded if fold else out
+            for lit in literals:
+                if lit in haystack:
+                    out = pattern.sub(repl, out)
+                    break
+    if len(out) > 4000:
+        out = out[:4000]
+    return out
+
+
+# Shell history repeats the same short commands constantly; longer texts rarely recur and
+# would only push those out of the cache.
+_SANITIZE_CACHE_MAX_LEN = 512
+_sanitize_short = functools.lru_cache(maxsize=4096)(_sanitize)
 
 IGNORE_SHELL_CMD_PREFIXES = (
     "history",
     "fc ",
 )
+# str.lower() never shortens text, so lowering just this many leading chars decides the prefix test.
+_IGNORE_SHELL_PREFIX_LEN = max(map(len, IGNORE_SHELL_CMD_PREFIXES))
 
 # ---------------------------------------------------------------------------
 # Logging setup
@@ -256,6 +341,7 @@ try:
 except ImportError:
     _HTTPX_OK = False
     logger.warning("httpx not installed; will only write local files.")
+_HTTP2_OK = _HTTPX_OK and importlib.util.find_spec("h2") is not None  # export uploads; https only
 
 # ---------------------------------------------------------------------------
 # Graceful shutdown
@@ -327,6 +413,26 @@ def _acquire_single_instance_lock() -> bool:
 
 
 def _count_antigravity_language_servers() -> int:
+    pattern = b"language_server_macos_arm"
+    if os.path.isdir("/proc/self"):
+        # Linux: read cmdlines directly instead of forking pgrep.
+        count = 0
+        self_pid = str(os.getpid())
+        try:
+            entries = os.listdir("/proc")
+        except OSError:
+            return 0
+        for name in entries:
+            if not name.isdigit() or name == self_pid:
+                continue
+            try:
+                with open(f"/proc/{name}/cmdline", "rb") as f:
+                    cmdline = f.read()
+            except OSError:
+                continue
+            if pattern in cmdline.replace(b"\0", b" "):
+                count += 1
+        return count
     try:
         proc = subprocess.run(
             ["pgrep", "-f", "language_server_macos_arm"],
@@ -341,13 +447,198 @@ def _count_antigravity_language_servers() -> int:
         return 0
 
 
+def _iter_delta_lines(fd: int, start: int, end: int, chunk_size: int = 1 << 20):
+    """Yield the raw lines in bytes [start, end) of fd, read with os.pread in bounded chunks."""
+    carry = b""
+    pos = start
+    while pos < end:
+        buf = os.pread(fd, min(chunk_size, end - pos), pos)
+        if not buf:
+            break
+        pos += len(buf)
+        lines = (carry + buf).split(b"\n") if carry else buf.split(b"\n")
+        carry = lines.pop()
+        yield from lines
+    if carry:
+        yield carry
+
+
+def _loads_json_line(line: bytes) -> Any:
+    if _orjson is not None:
+        try:
+            return _orjson.loads(line)
+        except _orjson.JSONDecodeError:
+            pass  # stdlib json has the final say (invalid UTF-8, NaN, huge ints)
+    try:
+        return json.loads(line)
+    except UnicodeDecodeError:
+        # Same lenient decoding the text-mode readers used for stray invalid bytes.
+        return json.loads(line.decode("utf-8", errors="replace"))
+
+
+def _scan_recent_files(
+    root: str, suffix: str, cutoff: float, limit: int, sizes: dict[str, tuple[int, int, int]] | None = None
+) -> list[str]:
+    """Walk root with scandir and return up to limit files ending in suffix modified at or
+    after cutoff, newest first. One stat per candidate file; hidden entries and symlinked
+    directories are skipped. If sizes is given it receives (inode, dev, size) for every
+    candidate file, recent or not."""
+    found: list[tuple[float, str]] = []
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    name = entry.name
+                    if name.startswith("."):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                            continue
+                        if not name.endswith(suffix):
+                            continue
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    mtime = st.st_mtime
+                    if sizes is not None:
+                        sizes[entry.path] = (st.st_ino, st.st_dev, st.st_size)
+                    if mtime >= cutoff:
+                        found.append((mtime, entry.path))
+        except OSError:
+            if current == root:
+                raise
+    return [path for _, path in heapq.nlargest(limit, found)]
+
+
+_O_NOFOLLOW = getattr(os, "O_NOFOLLOW", 0)
+
+
+def _write_secret(path: Path, text: str) -> bool:
+    """Write text to an owner-only (0o600) file; returns True if the file was newly created."""
+    data = memoryview(text.encode("utf-8"))
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | _O_NOFOLLOW, 0o600)
+        created = True
+    except FileExistsError:
+        fd = os.open(path, os.O_WRONLY | os.O_TRUNC | _O_NOFOLLOW)
+        created = False
+    try:
+        if not created:
+            # An existing file keeps its old mode; tighten it before any content lands.
+            os.fchmod(fd, 0o600)
+        while data:
+            data = data[os.write(fd, data) :]
+    finally:
+        os.close(fd)
+    return created
+
+
+class SessionStore:
+    """Live sessions as parallel columns indexed by slot.
+
+    ``order`` keeps sids in last_seen order (oldest first), so eviction and the idle
+    scan walk from the oldest end and stop early; removal swaps the last slot into
+    the freed one to keep columns dense.
+    """
+
+    def __init__(self):
+        self.ids: list[str] = []
+        self.sid_to_idx: dict[str, int] = {}
+        self.last_seen: list[float] = []
+        self.created: list[float] = []
+        self.exported: list[bool] = []
+        self.source: list[str] = []
+        self.messages: list[deque] = []
+        self.last_hash: list[bytes] = []
+        self.order: OrderedDict[str, None] = OrderedDict()
+        self.exported_count = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, sid: str) -> bool:
+        return sid in self.sid_to_idx
+
+    def add(self, sid: str, source: str, now: float) -> int:
+        idx = len(self.ids)
+        self.ids.append(sid)
+        self.sid_to_idx[sid] = idx
+        self.last_seen.append(now)
+        self.created.append(now)
+        self.exported.append(False)
+        self.source.append(source)
+        self.messages.append(deque(maxlen=MAX_MESSAGES_PER_SESSION))
+        self.last_hash.append(b"")
+        self.order[sid] = None
+        return idx
+
+    def touch(self, idx: int, now: float) -> None:
+        sid = self.ids[idx]
+        self.last_seen[idx] = now
+        self.order.move_to_end(sid)
+
+    def mark_exported(self, idx: int) -> None:
+        if not self.exported[idx]:
+            self.exported[idx] = True
+            self.exported_count += 1
+
+    def remove(self, sid: str) -> None:
+        idx = self.sid_to_idx.pop(sid)
+        del self.order[sid]
+        if self.exported[idx]:
+            self.exported_count -= 1
+        last = len(self.ids) - 1
+        if idx != last:
+            moved = self.ids[last]
+            self.ids[idx] = moved
+            self.sid_to_idx[moved] = idx
+            self.last_seen[idx] = self.last_seen[last]
+            self.created[idx] = self.created[last]
+            self.exported[idx] = self.exported[last]
+            self.source[idx] = self.source[last]
+            self.messages[idx] = self.messages[last]
+            self.last_hash[idx] = self.last_hash[last]
+        self.ids.pop()
+        self.last_seen.pop()
+        self.created.pop()
+        self.exported.pop()
+        self.source.pop()
+        self.messages.pop()
+        self.last_hash.pop()
+
+    def evict_oldest(self) -> None:
+        """Drop the least recently seen session, preferring ones that were already exported."""
+        # Sessions older than the oldest exported one are idle-but-unexported, which the
+        # idle scan clears quickly, so this walk normally stops within a few steps.
+        victim = None
+        if self.exported_count:
+            for sid in self.order:
+                if self.exported[self.sid_to_idx[sid]]:
+                    victim = sid
+                    break
+        if victim is None:
+            victim = next(iter(self.order), None)
+        if victim is not None:
+            self.remove(victim)
+
+
 class SessionTracker:
     def __init__(self):
-        self.sessions: dict[str, dict[str, Any]] = {}
-        self.file_cursors: dict[str, tuple[int, int]] = {}  # cursor_key -> (inode, offset)
+        self.sessions = SessionStore()
+        # (last_seen + IDLE_TIMEOUT_SEC, sid) for unexported sessions; stale entries are dropped lazily.
+        self._due_heap: list[tuple[float, str]] = []
+        self.file_cursors: dict[str, tuple[int, int, int]] = {}  # cursor_key -> (inode, dev, offset)
         self.antigravity_sessions: dict[str, dict[str, Any]] = {}
         self.active_jsonl: dict[str, dict[str, Any]] = {}
         self.active_shell: dict[str, str] = {}
+        self._path_digest_cache: dict[str, str] = {}  # path -> short digest used in cursor keys
+        self._missing_paths: dict[str, float] = {}  # source candidate -> when it was last seen missing
+        self._open_files: dict[str, tuple[int, int]] = {}  # cursor_key -> (inode, fd), LRU order
+        # Local-time day of the last shell line: [start, end) epoch bounds and its %Y%m%d label.
+        self._shell_day: tuple[float, float, str] = (0.0, 0.0, "")
 
         self._last_heartbeat = time.time()
         self._last_source_refresh = 0.0
@@ -363,23 +654,43 @@ class SessionTracker:
         self._last_index_sync = 0.0
         self._index_dirty = False
         self._cached_codex_session_files: list[str] = []
+        # path -> (inode, dev, size) of every codex session file at the last scan; None before the first.
+        self._codex_scan_sizes: dict[str, tuple[int, int, int]] | None = None
         self._cached_claude_transcript_files: list[str] = []
         self._cached_antigravity_dirs: list[str] = []
+        # HTTP work (exports and pending retries) runs on one worker thread so an
+        # unreachable Viking endpoint never stalls file polling.
+        self._export_q: queue.Queue = queue.Queue(maxsize=256)
+        self._export_stop = threading.Event()
+        self._export_thread: threading.Thread | None = None
+        # Pending files on disk; updated by the export worker, read by the polling loop.
+        self._pending_lock = threading.Lock()
+        self._pending_count = 0
+        self._pending_synced_at = 0.0
 
         if _HTTPX_OK:
             try:
                 self._http_client = httpx.Client(
-                    timeout=EXPORT_HTTP_TIMEOUT_SEC, trust_env=False, follow_redirects=False
+                    timeout=EXPORT_HTTP_TIMEOUT_SEC,
+                    trust_env=False,
+                    follow_redirects=False,
+                    http2=_HTTP2_OK,
+                    limits=httpx.Limits(max_keepalive_connections=4, max_connections=8, keepalive_expiry=300.0),
                 )
             except Exception as exc:
                 logger.warning("Failed to initialize httpx client: %s", exc)
                 self._http_client = None
+        if self._http_client:
+            self._export_thread = threading.Thread(target=self._export_worker, name="viking-export", daemon=True)
+            self._export_thread.start()
 
+        self._ensure_history_dir()
         PENDING_DIR.mkdir(parents=True, exist_ok=True)
         try:
             os.chmod(PENDING_DIR, 0o700)
         except OSError:
             pass
+        self._resync_pending_count()
         self.refresh_sources(force=True)
 
     # -- source discovery -------------------------------------------------
@@ -399,7 +710,7 @@ class SessionTracker:
             picked = None
             for candidate in candidates:
                 p = candidate["path"]
-                if os.path.exists(p):
+                if self._source_exists(p, now, force):
                     picked = candidate
                     break
             prev = self.active_jsonl.get(source_name)
@@ -418,7 +729,7 @@ class SessionTracker:
             for source_name, paths in SHELL_SOURCES.items():
                 picked_path = ""
                 for p in paths:
-                    if os.path.exists(p):
+                    if self._source_exists(p, now, force):
                         picked_path = p
                         break
                 prev = self.active_shell.get(source_name, "")
@@ -432,36 +743,102 @@ class SessionTracker:
                     logger.info("Source offline: %s", source_name)
                     del self.active_shell[source_name]
 
+    def _source_exists(self, path: str, now: float, force: bool = False) -> bool:
+        """os.path.exists, except a recently missing path is taken as still missing.
+
+        Paths that exist are always re-checked so a source going offline is noticed on
+        the next refresh; a forced refresh re-checks everything.
+        """
+        missing_since = self._missing_paths.get(path)
+        if not force and missing_since is not None and now - missing_since < SOURCE_MISSING_RECHECK_SEC:
+            return False
+        if os.path.exists(path):
+            self._missing_paths.pop(path, None)
+            return True
+        self._missing_paths[path] = now
+        return False
+
     def _cursor_key(self, kind: str, source_name: str, path: str) -> str:
-        digest = hashlib.sha256(path.encode("utf-8")).hexdigest()[:10]
+        digest = self._path_digest_cache.get(path)
+        if digest is None:
+            if len(self._path_digest_cache) >= MAX_FILE_CURSORS * 2:
+                self._path_digest_cache.clear()
+            digest = hashlib.blake2b(path.encode("utf-8"), digest_size=5).hexdigest()
+            self._path_digest_cache[path] = digest
         return f"{kind}:{source_name}:{digest}"
 
-    def _get_cursor(self, cursor_key: str, path: str) -> int:
-        """Return the byte offset for path, resetting to 0 if the file was rotated (inode changed)."""
-        try:
-            st = os.stat(path)
-        except OSError:
-            return 0
-        cur_inode = st.st_ino
+    def _get_cursor(self, cursor_key: str, path: str, st: os.stat_result | None = None) -> int:
+        """Return the byte offset for path, resetting to 0 if the file was rotated ((dev, inode) changed)."""
+        if st is None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return 0
         prev = self.file_cursors.get(cursor_key)
         if prev is None:
             # First time: start at current size to skip existing content
             return st.st_size
-        prev_inode, prev_offset = prev
-        if cur_inode != prev_inode:
+        prev_inode, prev_dev, prev_offset = prev
+        if st.st_ino != prev_inode or st.st_dev != prev_dev:
             # File was rotated/replaced
             return 0
         if st.st_size < prev_offset:
-            # File was truncated
-            return 0
+            # File was truncated in place: bound the replay to its tail
+            return self._replay_start(path, st.st_size)
         return prev_offset
 
-    def _set_cursor(self, cursor_key: str, path: str, offset: int) -> None:
+    @staticmethod
+    def _replay_start(path: str, size: int) -> int:
+        """First line boundary within the last TRUNCATE_REPLAY_BYTES of path (0 for small files)."""
+        start = size - TRUNCATE_REPLAY_BYTES
+        if start <= 0:
+            return 0
         try:
-            inode = os.stat(path).st_ino
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                # Include the byte before start so a window that already begins a line is kept.
+                window = os.pread(fd, size - start + 1, start - 1)
+            finally:
+                os.close(fd)
         except OSError:
-            return
-        self.file_cursors[cursor_key] = (inode, offset)
+            return start
+        nl = window.find(b"\n")
+        return size if nl < 0 else start + nl
+
+    def _set_cursor(self, cursor_key: str, path: str, offset: int, st: os.stat_result | None = None) -> None:
+        if st is None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return
+        self.file_cursors[cursor_key] = (st.st_ino, st.st_dev, offset)
+
+    def _open_tail(self, cursor_key: str, path: str, inode: int) -> int:
+        """Return a read-only fd kept open across polls, reopened when the file's inode changes."""
+        entry = self._open_files.pop(cursor_key, None)
+        if entry is not None:
+            if entry[0] == inode:
+                self._open_files[cursor_key] = entry
+                return entry[1]
+            os.close(entry[1])
+        fd = os.open(path, os.O_RDONLY)
+        self._open_files[cursor_key] = (inode, fd)
+        while len(self._open_files) > MAX_OPEN_TAIL_FILES:
+            oldest = next(iter(self._open_files))
+            self._drop_tail(oldest)
+        return fd
+
+    def _drop_tail(self, cursor_key: str) -> None:
+        entry = self._open_files.pop(cursor_key, None)
+        if entry is not None:
+            try:
+                os.close(entry[1])
+            except OSError:
+                pass
+
+    def close_open_files(self) -> None:
+        for cursor_key in list(self._open_files):
+            self._drop_tail(cursor_key)
 
     @staticmethod
     def _is_safe_source(path: str) -> bool:
@@ -493,37 +870,39 @@ class SessionTracker:
         if not self._is_safe_source(path):
             return
         try:
-            cur_size = os.path.getsize(path)
+            st = os.stat(path)
         except OSError:
+            self._drop_tail(cursor_key)
             return
+        cur_size = st.st_size
 
-        last = self._get_cursor(cursor_key, path)
+        last = self._get_cursor(cursor_key, path, st)
         if cur_size <= last:
-            self._set_cursor(cursor_key, path, cur_size)
+            self._set_cursor(cursor_key, path, cur_size, st)
             return
 
         try:
-            with open(path, "r", encoding="utf-8", errors="replace") as f:
-                f.seek(last)
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        data = json.loads(line)
-                    except json.JSONDecodeError:
-                        continue
+            fd = self._open_tail(cursor_key, path, st.st_ino)
+            for line in _iter_delta_lines(fd, last, cur_size):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    data = _loads_json_line(line)
+                except json.JSONDecodeError:
+                    continue
 
-                    sid = self._extract_sid(data, source.get("sid_keys", []), source_name)
-                    text = self._extract_text(data, source.get("text_keys", []))
-                    text = self._sanitize_text(text)
-                    if not text:
-                        continue
+                sid = self._extract_sid(data, source.get("sid_keys", []), source_name)
+                text = self._extract_text(data, source.get("text_keys", []))
+                text = self._sanitize_text(text)
+                if not text:
+                    continue
 
-                    self._upsert_session(sid, source_name, text, now)
+                self._upsert_session(sid, source_name, text, now)
 
-            self._set_cursor(cursor_key, path, cur_size)
+            self._set_cursor(cursor_key, path, cur_size, st)
         except Exception as exc:
+            self._drop_tail(cursor_key)
             self._error_count += 1
             logger.error("poll_jsonl_sources(%s): %s", source_name, exc)
 
@@ -537,26 +916,28 @@ class SessionTracker:
                 continue
             cursor_key = self._cursor_key("shell", source_name, path)
             try:
-                cur_size = os.path.getsize(path)
+                st = os.stat(path)
             except OSError:
+                self._drop_tail(cursor_key)
                 continue
+            cur_size = st.st_size
 
-            last = self._get_cursor(cursor_key, path)
+            last = self._get_cursor(cursor_key, path, st)
             if cur_size <= last:
-                self._set_cursor(cursor_key, path, cur_size)
+                self._set_cursor(cursor_key, path, cur_size, st)
                 continue
 
             try:
-                with open(path, "r", encoding="utf-8", errors="replace") as f:
-                    f.seek(last)
-                    for line in f:
-                        parsed = self._parse_shell_line(source_name, line)
-                        if not parsed:
-                            continue
-                        sid, text = parsed
-                        self._upsert_session(sid, source_name, text, now)
-                self._set_cursor(cursor_key, path, cur_size)
+                fd = self._open_tail(cursor_key, path, st.st_ino)
+                for line in _iter_delta_lines(fd, last, cur_size):
+                    parsed = self._parse_shell_line(source_name, line.decode("utf-8", errors="replace"))
+                    if not parsed:
+                        continue
+                    sid, text = parsed
+                    self._upsert_session(sid, source_name, text, now)
+                self._set_cursor(cursor_key, path, cur_size, st)
             except Exception as exc:
+                self._drop_tail(cursor_key)
                 self._error_count += 1
                 logger.error("poll_shell_sources(%s): %s", source_name, exc)
 
@@ -567,21 +948,23 @@ class SessionTracker:
             return
 
         now = time.time()
-        if now - self._last_codex_scan >= CODEX_SESSION_SCAN_INTERVAL_SEC or not self._cached_codex_session_files:
+        active_cutoff = now - 3600
+        if now - self._last_codex_scan >= CODEX_SESSION_SCAN_INTERVAL_SEC:
             try:
-                session_files = glob.glob(os.path.join(CODEX_SESSIONS, "**", "*.jsonl"), recursive=True)
-                if len(session_files) > MAX_CODEX_SESSION_FILES_PER_SCAN:
-                    session_files = sorted(
-                        session_files,
-                        key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0.0,
-                        reverse=True,
-                    )[:MAX_CODEX_SESSION_FILES_PER_SCAN]
+                # Only files touched within the active window are polled; older sessions
+                # are picked up again by the next scan once they are appended to.
+                sizes: dict[str, tuple[int, int, int]] = {}
+                session_files = _scan_recent_files(
+                    CODEX_SESSIONS, ".jsonl", active_cutoff, MAX_CODEX_SESSION_FILES_PER_SCAN, sizes
+                )
+                self._seed_codex_cursors(session_files, self._codex_scan_sizes, sizes)
+                self._codex_scan_sizes = sizes
                 self._cached_codex_session_files = session_files
                 self._last_codex_scan = now
                 logger.debug("codex sessions cache refreshed: %d files", len(session_files))
             except OSError as exc:
                 self._error_count += 1
-                logger.error("glob codex sessions: %s", exc)
+                logger.error("scan codex sessions: %s", exc)
                 session_files = self._cached_codex_session_files
         else:
             session_files = self._cached_codex_session_files
@@ -589,61 +972,82 @@ class SessionTracker:
         for path in session_files:
             if not self._is_safe_source(path):
                 continue
-            try:
-                mtime = os.path.getmtime(path)
-            except OSError:
-                continue
-            if mtime < now - 3600:
-                continue
-
             cursor_key = self._cursor_key("codex_session", "codex_session", path)
             try:
-                cur_size = os.path.getsize(path)
+                st = os.stat(path)
             except OSError:
+                self._drop_tail(cursor_key)
                 continue
+            if st.st_mtime < active_cutoff:
+                continue
+            cur_size = st.st_size
 
-            last = self._get_cursor(cursor_key, path)
+            last = self._get_cursor(cursor_key, path, st)
             if cur_size <= last:
-                self._set_cursor(cursor_key, path, cur_size)
+                self._set_cursor(cursor_key, path, cur_size, st)
                 continue
 
             try:
-                with open(path, "r", encoding="utf-8", errors="replace") as f:
-                    f.seek(last)
-                    for line in f:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        try:
-                            data = json.loads(line)
-                        except json.JSONDecodeError:
-                            continue
+                fd = self._open_tail(cursor_key, path, st.st_ino)
+                for line in _iter_delta_lines(fd, last, cur_size):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        data = _loads_json_line(line)
+                    except json.JSONDecodeError:
+                        continue
 
-                        if data.get("type") != "response_item":
-                            continue
-                        payload = data.get("payload", {})
-                        ptype = payload.get("type")
-                        text = ""
-                        if ptype == "message":
-                            texts = [
-                                c.get("text", "")
-                                for c in payload.get("content", [])
-                                if c.get("type") == "output_text"
-                            ]
-                            text = "\n".join(t for t in texts if t)
-                        elif ptype == "reasoning":
-                            text = payload.get("text", "")
-
-                        text = self._sanitize_text(text)
-                        if text:
-                            sid = os.path.basename(path)
-                            self._upsert_session(sid, "codex_session", text, now)
-
-                self._set_cursor(cursor_key, path, cur_size)
+                    if data.get("type") != "response_item":
+                        continue
+                    payload = data.get("payload", {})
+                    ptype = payload.get("type")
+                    text = ""
+                    if ptype == "message":
+                        texts = [
+                            c.get("text", "")
+                            for c in payload.get("content", [])
+                            if c.get("type") == "output_text"
+                        ]
+                        text = "\n".join(t for t in texts if t)
+                    elif ptype == "reasoning":
+                        text = payload.get("text", "")
+
+                    text = self._sanitize_text(text)
+                    if text:
+                        sid = os.path.basename(path)
+                        self._upsert_session(sid, "codex_session", text, now)
+
+                self._set_cursor(cursor_key, path, cur_size, st)
             except Exception as exc:
+                self._drop_tail(cursor_key)
                 self._error_count += 1
                 logger.error("poll_codex_sessions(%s): %s", path, exc)
 
+    def _seed_codex_cursors(
+        self,
+        session_files: list[str],
+        prev_sizes: dict[str, tuple[int, int, int]] | None,
+        sizes: dict[str, tuple[int, int, int]],
+    ) -> None:
+        """Start untracked files that became active since the previous scan where that scan left them.
+
+        A resumed session resumes at its size from the previous scan, and a file created since
+        then starts at 0, so lines appended between scans are not skipped. On the first scan
+        there is no reference point and _get_cursor starts at the current end as before.
+        """
+        if prev_sizes is None:
+            return
+        for path in session_files:
+            cursor_key = self._cursor_key("codex_session", "codex_session", path)
+            if cursor_key in self.file_cursors:
+                continue
+            prev = prev_sizes.get(path)
+            if prev is None:
+                inode, dev, _ = sizes[path]
+                prev = (inode, dev, 0)
+            self.file_cursors[cursor_key] = prev
+
     def poll_claude_transcripts(self):
         """Scan ~/.claude/transcripts/ses_*.jsonl for full AI conversation text.
 
@@ -688,88 +1092,78 @@ class SessionTracker:
         for path in session_files:
             if not self._is_safe_source(path):
                 continue
+            cursor_key = self._cursor_key("claude_transcripts", "claude_transcripts", path)
             try:
-                mtime = os.path.getmtime(path)
+                st = os.stat(path)
             except OSError:
+                self._drop_tail(cursor_key)
                 continue
+            cur_size = st.st_size
 
             # On very first encounter: if the file is older than the lookback
             # window, skip it to avoid replaying months of history.
-            cursor_key = self._cursor_key("claude_transcripts", "claude_transcripts", path)
             if cursor_key not in self.file_cursors:
-                try:
-                    fsize = os.path.getsize(path)
-                except OSError:
-                    fsize = 0
-                if mtime < lookback_cutoff:
+                if st.st_mtime < lookback_cutoff:
                     # Establish baseline at end-of-file; never re-read old content.
-                    self._set_cursor(cursor_key, path, fsize)
+                    self._set_cursor(cursor_key, path, cur_size, st)
                     continue
                 # New file within lookback window: start from beginning.
-                try:
-                    self.file_cursors[cursor_key] = (os.stat(path).st_ino, 0)
-                except OSError:
-                    continue
-
-            try:
-                cur_size = os.path.getsize(path)
-            except OSError:
-                continue
+                self.file_cursors[cursor_key] = (st.st_ino, st.st_dev, 0)
 
-            last = self._get_cursor(cursor_key, path)
+            last = self._get_cursor(cursor_key, path, st)
             if cur_size <= last:
-                self._set_cursor(cursor_key, path, cur_size)
+                self._set_cursor(cursor_key, path, cur_size, st)
                 continue
 
             messages_added = 0
             try:
-                with open(path, "r", encoding="utf-8", errors="replace") as f:
-                    f.seek(last)
-                    for raw in f:
-                        raw = raw.strip()
-                        if not raw:
-                            continue
-                        try:
-                            data = json.loads(raw)
-                        except json.JSONDecodeError:
-                            continue
+                fd = self._open_tail(cursor_key, path, st.st_ino)
+                for raw in _iter_delta_lines(fd, last, cur_size):
+                    raw = raw.strip()
+                    if not raw:
+                        continue
+                    try:
+                        data = _loads_json_line(raw)
+                    except json.JSONDecodeError:
+                        continue
 
-                        msg_type = data.get("type", "")
-                        # Only index human and AI text; skip tool noise
-                        if msg_type not in ("user", "assistant", "human"):
-                            continue
+                    msg_type = data.get("type", "")
+                    # Only index human and AI text; skip tool noise
+                    if msg_type not in ("user", "assistant", "human"):
+                        continue
 
-                        # Extract text — handles plain string or content-block lists
-                        content = data.get("content", "")
-                        if isinstance(content, str):
-                            text = content.strip()
-                        elif isinstance(content, list):
-                            parts = []
-                            for block in content:
-                                if isinstance(block, dict) and block.get("type") == "text":
-                                    t = block.get("text", "")
-                                    if isinstance(t, str) and t.strip():
-                                        parts.append(t.strip())
-                            text = " ".join(parts)
-                        elif isinstance(content, dict):
-                            t = content.get("text", "")
-                            text = t.strip() if isinstance(t, str) else ""
-                        else:
-                            text = ""
-
-                        text = self._sanitize_text(text)
-                        if not text:
-                            continue
+                    # Extract text — handles plain string or content-block lists
+                    content = data.get("content", "")
+                    if isinstance(content, str):
+                        text = content.strip()
+                    elif isinstance(content, list):
+                        parts = []
+                        for block in content:
+                            if isinstance(block, dict) and block.get("type") == "text":
+                                t = block.get("text", "")
+                                if isinstance(t, str) and t.strip():
+                                    parts.append(t.strip())
+                        text = " ".join(parts)
+                    elif isinstance(content, dict):
+                        t = content.get("text", "")
+                        text = t.strip() if isinstance(t, str) else ""
+                    else:
+                        text = ""
+
+                    text = self._sanitize_text(text)
+                    if not text:
+                        continue
 
-                        sid = self._build_transcript_sid(path)
-                        self._upsert_session(sid, "claude_transcripts", text, now)
-                        messages_added += 1
+                    sid = self._build_transcript_sid(path)
+                    self._upsert_session(sid, "claude_transcripts", text, now)
+                    messages_added += 1
 
-                self._set_cursor(cursor_key, path, cur_size)
+                self._set_cursor(cursor_key, path, cur_size, st)
                 if messages_added:
                     logger.debug("claude_transcripts: +%d msgs from %s", messages_added, os.path.basename(path))
 
             except Exception as exc:
+                self._drop_tail(cursor_key)
                 self._error_count += 1
                 logger.error("poll_claude_transcripts(%s): %s", path, exc)
 
@@ -945,35 +1339,48 @@ class SessionTracker:
         ts = int(time.time())
         cmd = line
 
-        match = SHELL_LINE_RE.match(line)
-        if match:
-            ts = int(match.group(1))
-            cmd = match.group(2).strip()
+        if line.startswith(":"):
+            # zsh extended history ": <start>:<elapsed>;<cmd>"; the regex only handles odd spacing.
+            semi = line.find(";", 2)
+            colon = line.find(":", 2, semi) if semi > 0 else -1
+            if (
+                line.startswith(": ")
+                and colon > 2
+                and line[2:colon].isdecimal()
+                and line[colon + 1 : semi].isdecimal()
+            ):
+                ts = int(line[2:colon])
+                cmd = line[semi + 1 :].strip()
+            else:
+                match = SHELL_LINE_RE.match(line)
+                if match:
+                    ts = int(match.group(1))
+                    cmd = match.group(2).strip()
 
         if not cmd:
             return None
 
-        low = cmd.lower()
-        if low.startswith(IGNORE_SHELL_CMD_PREFIXES):
+        if cmd[:_IGNORE_SHELL_PREFIX_LEN].lower().startswith(IGNORE_SHELL_CMD_PREFIXES):
             return None
 
         cmd = self._sanitize_text(cmd)
         if not cmd:
             return None
 
-        day = datetime.fromtimestamp(ts).strftime("%Y%m%d")
+        day_start, day_end, day = self._shell_day
+        if not day_start <= ts < day_end:
+            midnight = datetime.fromtimestamp(ts).replace(hour=0, minute=0, second=0, microsecond=0)
+            day = midnight.strftime("%Y%m%d")
+            self._shell_day = (midnight.timestamp(), (midnight + timedelta(days=1)).timestamp(), day)
         sid = f"{source_name}_{day}"
         return sid, cmd
 
     def _sanitize_text(self, text: str) -> str:
         if not text:
             return ""
-        out = strip_private_blocks(text).strip()
-        for pattern, repl in SECRET_REPLACEMENTS:
-            out = pattern.sub(repl, out)
-        if len(out) > 4000:
-            out = out[:4000]
-        return out
+        if len(text) <= _SANITIZE_CACHE_MAX_LEN:
+            return _sanitize_short(text)
+        return _sanitize(text)
 
     @staticmethod
     def _sanitize_filename_part(raw: str, default: str = "session") -> str:
@@ -992,64 +1399,79 @@ class SessionTracker:
 
     # -- session management -----------------------------------------------
     def _upsert_session(self, sid: str, source: str, text: str, now: float):
-        if sid not in self.sessions:
-            if len(self.sessions) >= MAX_TRACKED_SESSIONS:
+        store = self.sessions
+        idx = store.sid_to_idx.get(sid)
+        if idx is None:
+            if len(store) >= MAX_TRACKED_SESSIONS:
                 self._evict_oldest()
-            self.sessions[sid] = {
-                "last_seen": now,
-                "messages": [],
-                "exported": False,
-                "source": source,
-                "created": now,
-                "last_hash": "",
-            }
+            idx = store.add(sid, source, now)
 
-        sess = self.sessions[sid]
-        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
-        if digest == sess.get("last_hash"):
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+        if digest == store.last_hash[idx]:
             return
 
-        sess["messages"].append(text)
-        sess["last_hash"] = digest
-        sess["last_seen"] = now
+        store.messages[idx].append(text)
+        store.last_hash[idx] = digest
+        store.touch(idx, now)
+        if not store.exported[idx]:
+            heapq.heappush(self._due_heap, (now + IDLE_TIMEOUT_SEC, sid))
+            if len(self._due_heap) > 4 * len(store) + 64:
+                self._compact_due_heap()
         self._last_activity_ts = now
 
-        if len(sess["messages"]) > MAX_MESSAGES_PER_SESSION:
-            sess["messages"] = sess["messages"][-200:]
+    def _due_entry_valid(self, deadline: float, sid: str) -> bool:
+        store = self.sessions
+        idx = store.sid_to_idx.get(sid)
+        return idx is not None and not store.exported[idx] and store.last_seen[idx] + IDLE_TIMEOUT_SEC == deadline
+
+    def _compact_due_heap(self) -> None:
+        self._due_heap = [entry for entry in self._due_heap if self._due_entry_valid(*entry)]
+        heapq.heapify(self._due_heap)
+
+    def _nearest_idle_deadline(self) -> float | None:
+        """Earliest idle-export deadline among unexported sessions, or None if there are none."""
+        heap = self._due_heap
+        while heap:
+            if self._due_entry_valid(*heap[0]):
+                return heap[0][0]
+            heapq.heappop(heap)
+        return None
 
     def _evict_oldest(self):
-        exported = [(k, v) for k, v in self.sessions.items() if v["exported"]]
-        if exported:
-            oldest_k = min(exported, key=lambda x: x[1]["last_seen"])[0]
-            del self.sessions[oldest_k]
-            return
-        oldest_k = min(self.sessions, key=lambda k: self.sessions[k]["last_seen"])
-        del self.sessions[oldest_k]
+        self.sessions.evict_oldest()
 
     def check_and_export_idle(self):
         now = time.time()
+        store = self.sessions
         to_remove = []
 
-        for sid, data in self.sessions.items():
-            if data["exported"]:
-                if now - data["last_seen"] > SESSION_TTL_SEC:
+        # Oldest first: once a session is too fresh to export or expire, so is everything after it.
+        fresh_within = min(IDLE_TIMEOUT_SEC, SESSION_TTL_SEC)
+        for sid in store.order:
+            idx = store.sid_to_idx[sid]
+            idle = now - store.last_seen[idx]
+            if idle <= fresh_within:
+                break
+            if store.exported[idx]:
+                if idle > SESSION_TTL_SEC:
                     to_remove.append(sid)
                 continue
 
-            if now - data["last_seen"] <= IDLE_TIMEOUT_SEC:
+            if idle <= IDLE_TIMEOUT_SEC:
                 continue
 
-            source = data["source"]
+            source = store.source[idx]
+            messages = store.messages[idx]
             min_messages = 4 if source.startswith("shell_") else 2
-            if len(data["messages"]) >= min_messages:
-                self._export(sid, data)
-                data["exported"] = True
-            elif now - data.get("created", 0) > SESSION_TTL_SEC:
+            if len(messages) >= min_messages:
+                self._export(sid, {"source": source, "messages": messages})
+                store.mark_exported(idx)
+            elif now - store.created[idx] > SESSION_TTL_SEC:
                 # Discard stale sessions with insufficient messages
-                data["exported"] = True
+                store.mark_exported(idx)
 
         for sid in to_remove:
-            del self.sessions[sid]
+            store.remove(sid)
 
     def cleanup_cursors(self):
         if len(self.file_cursors) <= MAX_FILE_CURSORS:
@@ -1058,6 +1480,7 @@ class SessionTracker:
         remove_n = max(1, len(keys) // 3)
         for key in keys[:remove_n]:
             del self.file_cursors[key]
+            self._drop_tail(key)
         logger.info("Cleaned %d file cursors.", remove_n)
 
     def maybe_sync_index(self, force: bool = False):
@@ -1078,45 +1501,65 @@ class SessionTracker:
     def _export(self, sid: str, data: dict[str, Any], title_prefix: str = ""):
         source = data["source"]
         messages = data["messages"]
-        content = "\n- ".join(msg[:2000] for msg in messages[-60:])
+        # Works for both the live deque and the plain lists antigravity sessions carry.
+        tail = itertools.islice(messages, max(0, len(messages) - 60), None)
+        content = "\n- ".join(msg[:2000] for msg in tail)
 
         prefix = title_prefix or f"Live {source} Session"
         title = f"{prefix} {sid[:12]}"
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        now_dt = datetime.now()
+        ts = now_dt.strftime("%Y%m%d_%H%M%S")
 
-        local_dir = LOCAL_STORAGE_ROOT / "resources" / "shared" / "history"
-        local_dir.mkdir(parents=True, exist_ok=True)
-        try:
-            os.chmod(local_dir, 0o700)
-        except OSError:
-            pass
         source_safe = self._sanitize_filename_part(source, default="source")
         sid_safe = self._sanitize_filename_part(sid, default="sid")
-        file_path = local_dir / f"{source_safe}_{ts}_{sid_safe[:24]}.md"
+        file_path = HISTORY_DIR / f"{source_safe}_{ts}_{sid_safe[:24]}.md"
 
         formatted = (
             f"# {title}\n\n"
             f"Tags: {source}, live_sync, unified_context\n"
-            f"Date: {datetime.now().isoformat()}\n\n"
+            f"Date: {now_dt.isoformat()}\n\n"
             f"## Content\n- {content}\n"
         )
 
         try:
-            file_path.write_text(formatted, encoding="utf-8")
-            os.chmod(file_path, 0o600)
+            try:
+                _write_secret(file_path, formatted)
+            except FileNotFoundError:
+                # History dir is created at startup; recreate it if it was removed since.
+                self._ensure_history_dir()
+                _write_secret(file_path, formatted)
             self._index_dirty = True
             self.maybe_sync_index()
         except OSError as exc:
             logger.error("Failed to write local file %s: %s", file_path, exc)
             return False
 
-        if self._http_client:
+        if self._export_thread is not None:
             payload = {
                 "path": str(file_path),
                 "target": "viking://resources/shared/history",
                 "reason": f"Real-time sync of {source} session",
                 "instruction": f"Index real-time completed {source} conversation: {title}",
             }
+            try:
+                self._export_q.put_nowait(("export", (source, sid, file_path, formatted, payload)))
+                return True
+            except queue.Full:
+                logger.warning("Export queue full, queue pending: %s", file_path.name)
+
+        self._write_pending(file_path.name, formatted)
+        return False
+
+    @staticmethod
+    def _ensure_history_dir() -> None:
+        HISTORY_DIR.mkdir(parents=True, exist_ok=True)
+        try:
+            os.chmod(HISTORY_DIR, 0o700)
+        except OSError:
+            pass
+
+    def _post_export(self, source: str, sid: str, file_path: Path, formatted: str, payload: dict[str, Any]) -> bool:
+        if not self._export_stop.is_set():
             try:
                 resp = self._http_client.post(
                     f"{OPENVIKING_URL}/resources",
@@ -1132,15 +1575,75 @@ class SessionTracker:
             except Exception as exc:
                 logger.warning("Viking offline, queue pending: %s", exc)
 
-        pending_path = PENDING_DIR / file_path.name
+        self._write_pending(file_path.name, formatted)
+        return False
+
+    def _write_pending(self, name: str, formatted: str) -> None:
+        pending_path = PENDING_DIR / name
         try:
             self._prune_pending_files()
-            pending_path.write_text(formatted, encoding="utf-8")
-            os.chmod(pending_path, 0o600)
+            if _write_secret(pending_path, formatted):
+                self._adjust_pending_count(1)
             logger.info("Queued pending sync: %s", pending_path.name)
         except OSError as exc:
             logger.error("Failed pending write: %s", exc)
-        return False
+
+    def _set_pending_count(self, count: int) -> None:
+        with self._pending_lock:
+            self._pending_count = max(0, count)
+            self._pending_synced_at = time.time()
+
+    def _adjust_pending_count(self, delta: int) -> None:
+        with self._pending_lock:
+            self._pending_count = max(0, self._pending_count + delta)
+
+    def _resync_pending_count(self) -> None:
+        try:
+            count = sum(1 for _ in PENDING_DIR.glob("*.md")) if PENDING_DIR.exists() else 0
+        except OSError:
+            count = 0
+        self._set_pending_count(count)
+
+    def _pending_file_count(self) -> int:
+        if time.time() - self._pending_synced_at >= PENDING_COUNT_RESYNC_SEC:
+            self._resync_pending_count()
+        return self._pending_count
+
+    def _export_worker(self):
+        while True:
+            job = self._export_q.get()
+            if job is None:
+                return
+            kind, args = job
+            try:
+                if kind == "export":
+                    self._post_export(*args)
+                elif kind == "retry" and not self._export_stop.is_set():
+                    self._retry_pending()
+            except Exception as exc:
+                logger.error("export worker (%s): %s", kind, exc)
+
+    def stop_export_worker(self, timeout: float = EXPORT_HTTP_TIMEOUT_SEC + 5):
+        """Stop the worker; exports still queued skip HTTP and land in PENDING_DIR."""
+        if self._export_thread is None:
+            return
+        self._export_stop.set()
+        try:
+            self._export_q.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._export_thread.join(timeout)
+        if self._export_thread.is_alive():
+            logger.warning("Export worker still busy at shutdown; moving queued exports to pending.")
+        self._export_thread = None
+        while True:
+            try:
+                job = self._export_q.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None and job[0] == "export":
+                _source, _sid, file_path, formatted, _payload = job[1]
+                self._write_pending(file_path.name, formatted)
 
     def _retry_pending(self):
         if not self._http_client:
@@ -1161,6 +1664,7 @@ class SessionTracker:
                 return 0.0
 
         pending.sort(key=_safe_mtime)
+        self._set_pending_count(len(pending))
         if not pending:
             return
 
@@ -1180,6 +1684,7 @@ class SessionTracker:
                 )
                 if resp.status_code < 300:
                     pf.unlink(missing_ok=True)
+                    self._adjust_pending_count(-1)
                     logger.info("Retried pending OK: %s", pf.name)
             except Exception:
                 break
@@ -1190,6 +1695,7 @@ class SessionTracker:
         except Exception:
             return
         if len(files) < MAX_PENDING_FILES:
+            self._set_pending_count(len(files))
             return
         def _safe_mtime(p: Path) -> float:
             try:
@@ -1198,25 +1704,28 @@ class SessionTracker:
                 return 0.0
 
         files.sort(key=_safe_mtime)
+        removed = 0
         for old in files[: len(files) - MAX_PENDING_FILES + 1]:
             try:
                 old.unlink(missing_ok=True)
+                removed += 1
             except Exception:
                 continue
+        self._set_pending_count(len(files) - removed)
 
     def maybe_retry_pending(self):
-        if not PENDING_DIR.exists():
-            return
-        try:
-            has_pending = any(PENDING_DIR.glob("*.md"))
-        except Exception:
-            has_pending = False
-        if not has_pending:
+        if not self._pending_file_count():
             return
         now = time.time()
         if now - self._last_pending_retry < PENDING_RETRY_INTERVAL_SEC:
             return
-        self._retry_pending()
+        if self._export_thread is None:
+            return
+        self._last_pending_retry = now
+        try:
+            self._export_q.put_nowait(("retry", None))
+        except queue.Full:
+            pass
 
     def next_sleep_interval(self) -> int:
         """Adaptive polling: faster near idle-export boundary, quiet when idle.
@@ -1237,13 +1746,9 @@ class SessionTracker:
         )
 
         # Night mode: only throttle if no sessions are actively pending export
-        has_pending_sessions = any(
-            not v.get("exported") for v in self.sessions.values()
-        )
-        try:
-            has_pending_files = PENDING_DIR.exists() and any(PENDING_DIR.glob("*.md"))
-        except Exception:
-            has_pending_files = False
+        nearest_deadline = self._nearest_idle_deadline()
+        has_pending_sessions = nearest_deadline is not None
+        has_pending_files = self._pending_file_count() > 0
 
         if is_night and not has_pending_sessions and not has_pending_files:
             return max(1, NIGHT_POLL_INTERVAL_SEC)
@@ -1261,13 +1766,7 @@ class SessionTracker:
             pass
 
         now = time.time()
-        nearest_due = None
-        for data in self.sessions.values():
-            if data.get("exported"):
-                continue
-            remaining = IDLE_TIMEOUT_SEC - (now - data.get("last_seen", now))
-            if nearest_due is None or remaining < nearest_due:
-                nearest_due = remaining
+        nearest_due = nearest_deadline - now if nearest_deadline is not None else None
 
         if nearest_due is not None:
             if nearest_due <= FAST_POLL_INTERVAL_SEC:
@@ -1300,7 +1799,7 @@ class SessionTracker:
         except Exception:
             mem_mb = -1
 
-        pending_count = len(list(PENDING_DIR.glob("*.md"))) if PENDING_DIR.exists() else 0
+        pending_count = self._pending_file_count()
 
         active_sources = list(self.active_jsonl.keys()) + list(self.active_shell.keys())
         logger.info(
@@ -1402,6 +1901,8 @@ def main():
         time.sleep(max(1.0, sleep_s))
 
     tracker.maybe_sync_index(force=True)
+    tracker.close_open_files()
+    tracker.stop_export_worker()
     if tracker._http_client:
         try:
             tracker._http_client.close()